@@ -1,5 +1,20 @@
+from typing import Tuple, Union
+
 import numpy as np
-from numpy.typing import NDArray
+from numpy.typing import DTypeLike, NDArray
+
+
+def aligned_zeros(
+    shape: Union[int, Tuple[int, ...]], dtype: DTypeLike, align: int = 16
+) -> NDArray:
+    """Like np.zeros, but the data pointer is guaranteed to be aligned
+    to `align` bytes (over-allocates and then offsets into the allocation)
+    """
+    dtype = np.dtype(dtype)
+    nbytes = int(np.prod(shape)) * dtype.itemsize
+    raw = np.zeros(nbytes + align, dtype=np.uint8)
+    offset = (-raw.ctypes.data) % align
+    return raw[offset : offset + nbytes].view(dtype).reshape(shape)
 
 
 def proj_frustum(
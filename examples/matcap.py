@@ -12,8 +12,10 @@ from trimesh_helpers import euler_matrix, load_mesh_simple
 import xgpu as xg
 from xgpu.extensions import (
     BinderBuilder,
+    ReleasePool,
     XDevice,
     create_default_view,
+    get_or_create_sampler,
     get_preferred_format,
 )
 from xgpu.extensions.glfw_window import GLFWWindow
@@ -150,11 +152,11 @@ class ModelBindgroup:
             viewdim=xg.TextureViewDimension._2D,
         )
         self.samp = builder.add_sampler(binding=3, visibility=xg.ShaderStage.Fragment)
-        self.sampler = device.createSampler(
+        self.sampler = get_or_create_sampler(
+            device,
             minFilter=xg.FilterMode.Linear,
             magFilter=xg.FilterMode.Linear,
             mipmapFilter=xg.MipmapFilterMode.Linear,
-            compare=xg.CompareFunction.Undefined,
         )
         self.binder = builder.complete()
         self.layout = self.binder.layout
@@ -183,13 +185,13 @@ def load_geometry_buffers(
 ) -> Tuple[xg.VertexBufferLayout, xg.Buffer, xg.Buffer, int, int]:
     raw_verts, raw_indices, vlayout = load_mesh_simple(fn)
 
-    vdata = bytes(raw_verts)
-    idata = bytes(raw_indices)
     vcount = len(raw_verts)
     icount = len(raw_indices)
 
-    vbuff = device.createBufferWithData(vdata, xg.BufferUsage.Vertex)
-    ibuff = device.createBufferWithData(idata, xg.BufferUsage.Index)
+    vbuff = device.createBufferWithData(xg.DataPtr.wrap(raw_verts), xg.BufferUsage.Vertex)
+    ibuff = device.createBufferWithData(
+        xg.DataPtr.wrap(raw_indices), xg.BufferUsage.Index
+    )
     return vlayout, vbuff, ibuff, vcount, icount
 
 
@@ -335,47 +337,66 @@ def main() -> None:
         for idx in range(CUBECOUNT)
     ]
 
+    queue = device.getQueue()
+    vsize = vbuff.getSize()
+    isize = ibuff.getSize()
+
+    # only the color view changes from frame to frame
+    color_attachment = xg.renderPassColorAttachment(
+        view=None,
+        depthSlice=0,
+        loadOp=xg.LoadOp.Clear,
+        storeOp=xg.StoreOp.Store,
+        clearValue=xg.color(r=0.5, g=0.5, b=0.5, a=1.0),
+    )
+    depth_attachment = xg.renderPassDepthStencilAttachment(
+        view=depth_view,
+        depthLoadOp=xg.LoadOp.Clear,
+        depthStoreOp=xg.StoreOp.Store,
+        depthClearValue=1.0,
+        stencilLoadOp=xg.LoadOp.Undefined,
+        stencilStoreOp=xg.StoreOp.Undefined,
+    )
+
+    # per-model positions and spin rates don't change, so compute them once
+    positions = np.zeros((CUBECOUNT, 3), dtype=np.float32)
+    positions[:, 0] = np.linspace(-0.5, 0.5, CUBECOUNT, endpoint=True)
+    positions[:, 2] = -2.0
+    rotspeeds = [-0.02 * ((uidx % 2) * 2.0 - 1.0) for uidx in range(CUBECOUNT)]
+    model_mats = cpu_model_ubuff["model_mat"]
+    normal_mats = cpu_model_ubuff["normal_mat"]
+
+    # per-frame encoders are released together once the frame is presented
+    frame_pool = ReleasePool()
+
     while window.poll():
-        for uidx, xpos in enumerate(np.linspace(-0.5, 0.5, CUBECOUNT, endpoint=True)):
-            pos = np.array([xpos, 0.0, -2.0], dtype=np.float32)
-            rotspeed = -0.02 * ((uidx % 2) * 2.0 - 1.0)
+        for uidx in range(CUBECOUNT):
             set_transform(
-                cpu_model_ubuff[uidx]["model_mat"],
-                cpu_model_ubuff[uidx]["normal_mat"],
-                (0.0, frame * rotspeed, 0.0),
+                model_mats[uidx],
+                normal_mats[uidx],
+                (0.0, frame * rotspeeds[uidx], 0.0),
                 1.0,
-                pos,
+                positions[uidx],
             )
 
-        command_encoder = device.createCommandEncoder()
-        queue = device.getQueue()
         queue.writeBuffer(view_ubuff, 0, view_ubuff_staging)
         queue.writeBuffer(model_ubuff, 0, model_ubuff_staging)
 
-        color_view = window.begin_frame()
+        command_encoder = frame_pool.add(device.createCommandEncoder())
 
-        color_attachment = xg.renderPassColorAttachment(
-            view=color_view,
-            depthSlice=0,
-            loadOp=xg.LoadOp.Clear,
-            storeOp=xg.StoreOp.Store,
-            clearValue=xg.color(r=0.5, g=0.5, b=0.5, a=1.0),
-        )
-        depth_attachment = xg.renderPassDepthStencilAttachment(
-            view=depth_view,
-            depthLoadOp=xg.LoadOp.Clear,
-            depthStoreOp=xg.StoreOp.Store,
-            depthClearValue=1.0,
-            stencilLoadOp=xg.LoadOp.Undefined,
-            stencilStoreOp=xg.StoreOp.Undefined,
-        )
-        render_pass = command_encoder.beginRenderPass(
-            colorAttachments=[color_attachment], depthStencilAttachment=depth_attachment
+        # acquire the swapchain texture only right before it's needed, so that
+        # any wait for it comes after all other frame work has been done
+        color_attachment.view = window.begin_frame()
+        render_pass = frame_pool.add(
+            command_encoder.beginRenderPass(
+                colorAttachments=[color_attachment],
+                depthStencilAttachment=depth_attachment,
+            )
         )
 
         render_pass.setPipeline(render_pipeline)
-        render_pass.setVertexBuffer(0, vbuff, 0, vbuff.getSize())
-        render_pass.setIndexBuffer(ibuff, xg.IndexFormat.Uint32, 0, ibuff.getSize())
+        render_pass.setVertexBuffer(0, vbuff, 0, vsize)
+        render_pass.setIndexBuffer(ibuff, xg.IndexFormat.Uint32, 0, isize)
         render_pass.setBindGroup(0, global_bg, [])
 
         for bg in bgs:
@@ -384,12 +405,11 @@ def main() -> None:
 
         render_pass.end()
 
-        queue.submit([command_encoder.finish()])
+        queue.submit([frame_pool.add(command_encoder.finish())])
 
         window.end_frame(present=True)
 
-        command_encoder.release()
-        render_pass.release()
+        frame_pool.flush()
 
         frame += 1
     print("Window close requested.")
@@ -1,5 +1,6 @@
+import functools
 import os
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
@@ -107,6 +108,46 @@ def handle_test_output(test_name: str, output: NDArray) -> None:
             print(f"[PASS] Output differs by {diff} from snapshot.")
 
 
+@functools.lru_cache(maxsize=1)
+def _startup() -> Tuple[xg.Instance, xg.extensions.XAdapter, xg.extensions.XDevice]:
+    """Acquire the instance/adapter/device once and share them across harnesses"""
+    instance, adapter, device, _surf = xg.extensions.startup()
+    return instance, adapter, device
+
+
+def get_device() -> xg.extensions.XDevice:
+    """The device shared by all tests, for tests that don't render"""
+    return _startup()[2]
+
+
+# retired render targets, keyed by (width, height, format, usage)
+_tex_pool: Dict[Tuple[int, int, xg.TextureFormat, int], List[xg.Texture]] = {}
+
+
+def _acquire_texture(
+    device: xg.Device,
+    width: int,
+    height: int,
+    format: xg.TextureFormat,
+    usage: int,
+) -> xg.Texture:
+    pooled = _tex_pool.get((width, height, format, usage))
+    if pooled:
+        return pooled.pop()
+    return device.createTexture(
+        usage=usage,
+        dimension=xg.TextureDimension._2D,
+        size=xg.extent3D(width=width, height=height, depthOrArrayLayers=1),
+        format=format,
+        viewFormats=[format],
+    )
+
+
+def _retire_texture(tex: xg.Texture, usage: int) -> None:
+    key = (tex.getWidth(), tex.getHeight(), tex.getFormat(), usage)
+    _tex_pool.setdefault(key, []).append(tex)
+
+
 class RenderHarness:
     def __init__(
         self,
@@ -117,41 +158,38 @@ class RenderHarness:
     ):
         self.name = name
         self.width, self.height = resolution
-        self.instance, self.adapter, self.device, _surf = xg.extensions.startup()
-        texsize = xg.extent3D(width=self.width, height=self.height, depthOrArrayLayers=1)
-        self.color_tex = self.device.createTexture(
-            usage=xg.TextureUsage.RenderAttachment | xg.TextureUsage.CopySrc,
-            dimension=xg.TextureDimension._2D,
-            size=texsize,
-            format=color_format,
-            viewFormats=[color_format],
+        self.instance, self.adapter, self.device = _startup()
+        self._color_usage = int(xg.TextureUsage.RenderAttachment | xg.TextureUsage.CopySrc)
+        self._depth_usage = int(xg.TextureUsage.RenderAttachment)
+        self.color_tex = _acquire_texture(
+            self.device, self.width, self.height, color_format, self._color_usage
         )
-        self.depth_tex = self.device.createTexture(
-            usage=xg.TextureUsage.RenderAttachment,
-            dimension=xg.TextureDimension._2D,
-            size=texsize,
-            format=depth_format,
-            viewFormats=[depth_format],
+        self.depth_tex = _acquire_texture(
+            self.device, self.width, self.height, depth_format, self._depth_usage
         )
 
+    def retire(self) -> None:
+        """Return this harness's render targets to the pool for reuse"""
+        _retire_texture(self.color_tex, self._color_usage)
+        _retire_texture(self.depth_tex, self._depth_usage)
+
     def create_cube_mesh(self) -> Tuple[xg.Buffer, xg.Buffer, xg.VertexBufferLayout]:
-        raw_verts = []
-        for z in [-1.0, 1.0]:
-            for y in [-1.0, 1.0]:
-                for x in [-1.0, 1.0]:
-                    raw_verts.extend([x, y, z, 1.0])
-
-        vdata = bytes(np.array(raw_verts, dtype=np.float32))
-        indexlist = """
-        0 1 3 3 2 0
-        1 5 7 7 3 1
-        4 6 7 7 5 4
-        2 6 4 4 0 2
-        0 4 5 5 1 0
-        3 7 6 6 2 3
-        """
-        raw_indices = [int(s) for s in indexlist.split()]
-        idata = bytes(np.array(raw_indices, dtype=np.uint16))
+        zz, yy, xx = np.meshgrid([-1.0, 1.0], [-1.0, 1.0], [-1.0, 1.0], indexing="ij")
+        corners = np.stack([xx, yy, zz, np.ones_like(xx)], axis=-1).reshape(-1, 4)
+
+        vdata = xg.DataPtr.wrap(corners.astype(np.float32))
+        indices = np.array(
+            [
+                [0, 1, 3, 3, 2, 0],
+                [1, 5, 7, 7, 3, 1],
+                [4, 6, 7, 7, 5, 4],
+                [2, 6, 4, 4, 0, 2],
+                [0, 4, 5, 5, 1, 0],
+                [3, 7, 6, 6, 2, 3],
+            ],
+            dtype=np.uint16,
+        )
+        idata = xg.DataPtr.wrap(indices)
 
         vbuff = self.device.createBufferWithData(vdata, xg.BufferUsage.Vertex)
         ibuff = self.device.createBufferWithData(idata, xg.BufferUsage.Index)
@@ -177,20 +215,20 @@ class RenderHarness:
         vertex_layouts: Optional[List[xg.VertexBufferLayout]] = None,
     ) -> None:
         device = self.device
-        shader = device.createWGSLShaderModule(code=shader_src)
+        color_tex = self.color_tex
         if bind_layouts is None:
             bind_layouts = []
+        if vertex_layouts is None:
+            vertex_layouts = []
+
+        shader = device.createWGSLShaderModule(code=shader_src)
         layout = device.createPipelineLayout(bindGroupLayouts=bind_layouts)
         self.pipeline_layout = layout
 
-        color_tex = self.color_tex
-
         primitive = xg.primitiveState(
             topology=xg.PrimitiveTopology.TriangleList,
             stripIndexFormat=xg.IndexFormat.Undefined,
         )
-        if vertex_layouts is None:
-            vertex_layouts = []
         vertex = xg.vertexState(
             module=shader, entryPoint="vs_main", constants=[], buffers=vertex_layouts
         )
@@ -250,9 +288,10 @@ class RenderHarness:
 
     def finish(self) -> None:
         self.renderpass.end()
-        self.device.getQueue().submit([self.encoder.finish()])
+        self.device.queue.submit([self.encoder.finish()])
         texbytes = self.device.readRGBATexture(self.color_tex)
         self.output = np.frombuffer(texbytes, dtype=np.uint8).reshape(
             (self.height, self.width, -1)
         )
+        self.retire()
         handle_test_output(self.name, self.output)
@@ -2,7 +2,7 @@ import argparse
 import subprocess
 from typing import Tuple
 
-TESTLIST = ["triangle", "cubes"]
+TESTLIST = ["triangle", "cubes", "bindgroups", "readback", "ktx", "shaders"]
 
 
 def runtest(name: str, snapshotdir: str, emit: bool, thresh: float) -> Tuple[bool, str]:
@@ -0,0 +1,66 @@
+import gc
+import weakref
+
+import harness
+
+import xgpu as xg
+from xgpu.extensions import BinderBuilder
+from xgpu.extensions.wrappers import BINDGROUP_CACHE_LIMIT
+
+UNIFORM_USAGE = xg.BufferUsage.Uniform | xg.BufferUsage.CopyDst
+
+
+def runtest() -> None:
+    device = harness.get_device()
+    builder = BinderBuilder(device)
+    uniforms = builder.add_buffer(
+        binding=0, visibility=xg.ShaderStage.Vertex, type=xg.BufferBindingType.Uniform
+    )
+    binder = builder.complete()
+    buf_a = device.createBuffer(usage=UNIFORM_USAGE, size=256)
+    buf_b = device.createBuffer(usage=UNIFORM_USAGE, size=256)
+
+    # uncached bindgroups are owned (and may be released) by the caller
+    uniforms.set(buf_a)
+    for _ in range(2):
+        bg = binder.create_bindgroup()
+        assert bg.isValid()
+        bg.release()
+
+    # same resources -> same group; a different buffer or range -> new group
+    cached = binder.create_bindgroup_cached()
+    assert binder.create_bindgroup_cached() is cached
+    uniforms.set(buf_b)
+    assert binder.create_bindgroup_cached() is not cached
+    uniforms.set(buf_a, size=128)
+    assert binder.create_bindgroup_cached() is not cached
+    uniforms.set(buf_a)
+    assert binder.create_bindgroup_cached() is cached
+
+    # entries are keyed on id() of the bound objects, so the cache must keep
+    # those objects alive: otherwise a new object could reuse a dropped one's id
+    # and be handed its bindgroup
+    buf_c = device.createBuffer(usage=UNIFORM_USAGE, size=256)
+    uniforms.set(buf_c)
+    binder.create_bindgroup_cached()
+    buf_c_ref = weakref.ref(buf_c)
+    uniforms.set(buf_a)
+    del buf_c
+    gc.collect()
+    assert buf_c_ref() is not None
+    binder.clear_cache()
+    gc.collect()
+    assert buf_c_ref() is None
+
+    # the cache is bounded
+    binder.clear_cache()
+    for _ in range(BINDGROUP_CACHE_LIMIT + 8):
+        uniforms.set(device.createBuffer(usage=UNIFORM_USAGE, size=256))
+        binder.create_bindgroup_cached()
+    assert len(binder._bg_cache) == BINDGROUP_CACHE_LIMIT
+
+    print("[PASS] Bindgroup caching")
+
+
+if __name__ == "__main__":
+    runtest()
@@ -1,9 +1,9 @@
+import math
 import os
 from typing import Optional, Sequence
 
 import harness
 import numpy as np
-import trimesh
 from numpy.typing import NDArray
 
 import xgpu as xg
@@ -13,9 +13,17 @@ from xgpu.extensions import BinderBuilder
 def set_transform(
     target: NDArray, rot: Sequence[float], scale: float, pos: NDArray
 ) -> None:
-    # Note: webgpu expects column-major array order
-    r = trimesh.transformations.euler_matrix(rot[0], rot[1], rot[2])
-    target[0:3, 0:3] = r[0:3, 0:3].T * scale
+    # Equivalent to trimesh.transformations.euler_matrix(*rot) (static xyz),
+    # but written out directly since building the 4x4 is surprisingly expensive
+    ca, sa = math.cos(rot[0]), math.sin(rot[0])
+    cb, sb = math.cos(rot[1]), math.sin(rot[1])
+    cc, sc = math.cos(rot[2]), math.sin(rot[2])
+    # Note: webgpu expects column-major array order, so target[col, row]
+    target[0:3, 0:3] = (
+        (cb * cc * scale, cb * sc * scale, -sb * scale),
+        ((sb * sa * cc - ca * sc) * scale, (sb * sa * sc + ca * cc) * scale, cb * sa * scale),
+        ((sb * ca * cc + sa * sc) * scale, (sb * ca * sc - sa * cc) * scale, cb * ca * scale),
+    )
     target[3, 0:3] = pos
     target[3, 3] = 1.0
 
@@ -93,8 +101,8 @@ def fill_cubes(buff: NDArray, rows: int, cols: int) -> None:
                 0.7 / rows,
                 pos,
             )
-            buff[uidx]["color"] = (1.0, 1.0, 1.0, 1.0)
             uidx += 1
+    buff["color"] = (1.0, 1.0, 1.0, 1.0)
 
 
 def runtest() -> None:
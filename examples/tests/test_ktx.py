@@ -0,0 +1,88 @@
+import struct
+from typing import List
+
+import harness
+
+import xgpu as xg
+from xgpu.extensions.ktx import (
+    HEADER_FORMAT,
+    HEADER_SIZE,
+    LEVEL_INDEX_FORMAT,
+    KTXTextureData,
+    block_count,
+    mip_pixel_size,
+)
+
+KTX2_IDENT = bytes(
+    [0xAB, 0x4B, 0x54, 0x58, 0x20, 0x32, 0x30, 0xBB, 0x0D, 0x0A, 0x1A, 0x0A]
+)
+VK_FORMAT_R8G8B8A8_UNORM = 37
+
+
+def level_bytes(width: int, height: int, depth: int, mip: int) -> bytes:
+    """Uncompressed RGBA8 data for a mip, filled with the mip index + 1"""
+    size = max(1, width >> mip) * max(1, height >> mip) * max(1, depth >> mip) * 4
+    return bytes([mip + 1]) * size
+
+
+def make_ktx(width: int, height: int, depth: int, levels: int) -> bytes:
+    header = struct.pack(
+        HEADER_FORMAT,
+        KTX2_IDENT,
+        VK_FORMAT_R8G8B8A8_UNORM,
+        1,  # typeSize
+        width,
+        height,
+        depth,
+        0,  # layerCount
+        1,  # faceCount
+        levels,
+        0,  # supercompressionScheme
+        *([0] * 6),  # dfd/kvd/sgd offsets and lengths
+    )
+    datas = [level_bytes(width, height, depth, mip) for mip in range(levels)]
+    offset = HEADER_SIZE + levels * struct.calcsize(LEVEL_INDEX_FORMAT)
+    index: List[bytes] = []
+    for data in datas:
+        index.append(struct.pack(LEVEL_INDEX_FORMAT, offset, len(data), len(data)))
+        offset += len(data)
+    return header + b"".join(index) + b"".join(datas)
+
+
+def test_mip_math() -> None:
+    assert [mip_pixel_size(13, mip) for mip in range(5)] == [13, 6, 3, 1, 0]
+    assert mip_pixel_size(0, 2) == 0
+    assert [block_count(13, mip, 4) for mip in range(5)] == [4, 2, 1, 1, 1]
+    assert block_count(0, 0, 4) == 1
+
+    ktx = KTXTextureData(make_ktx(16, 8, 4, 3))
+    assert ktx.level_count == 3
+    assert ktx.pixel_extent(0) == (16, 8, 4)
+    assert ktx.pixel_extent(1) == (8, 4, 2)
+    assert ktx.pixel_extent(2) == (4, 2, 1)
+    for mip in range(3):
+        assert bytes(ktx.get_level_data(mip)) == level_bytes(16, 8, 4, mip)
+
+
+def test_mip_clamp() -> None:
+    # a file claiming more levels than an 8x2 texture can have (4: 8x2 .. 1x1)
+    ktx = KTXTextureData(make_ktx(8, 2, 0, 6))
+    assert ktx.level_count == 6
+    assert ktx.max_mip_count == 4
+
+    device = harness.get_device()
+    tex = ktx.create_texture(device, xg.TextureUsage.CopySrc)
+    assert tex.getMipLevelCount() == 4
+    tex = ktx.create_texture(device, xg.TextureUsage.CopySrc, mip_count=2)
+    assert tex.getMipLevelCount() == 2
+    assert device.readRGBATexture(tex) == level_bytes(8, 2, 0, 0)
+
+
+def runtest() -> None:
+    test_mip_math()
+    test_mip_clamp()
+    print("[PASS] KTX mips")
+
+
+if __name__ == "__main__":
+    runtest()
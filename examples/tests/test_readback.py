@@ -0,0 +1,143 @@
+from typing import List, Tuple
+
+import harness
+import numpy as np
+
+import xgpu as xg
+from xgpu.extensions import TexReadbackRing, XDevice, readback, wrappers
+
+# rows of this size need padding to the 256 byte copy alignment
+WIDTH, HEIGHT = 13, 7
+
+
+def make_texture(device: XDevice, seed: int) -> Tuple[xg.Texture, bytes]:
+    pixels = np.random.default_rng(seed).integers(
+        0, 256, (HEIGHT, WIDTH, 4), dtype=np.uint8
+    )
+    extent = xg.extent3D(width=WIDTH, height=HEIGHT, depthOrArrayLayers=1)
+    tex = device.createTexture(
+        usage=xg.TextureUsage.CopySrc | xg.TextureUsage.CopyDst,
+        dimension=xg.TextureDimension._2D,
+        size=extent,
+        format=xg.TextureFormat.RGBA8Unorm,
+        viewFormats=[xg.TextureFormat.RGBA8Unorm],
+    )
+    device.queue.writeTexture(
+        xg.imageCopyTexture(
+            texture=tex,
+            mipLevel=0,
+            origin=xg.origin3D(x=0, y=0, z=0),
+            aspect=xg.TextureAspect.All,
+        ),
+        data=xg.DataPtr.wrap(pixels),
+        dataLayout=xg.textureDataLayout(
+            offset=0, bytesPerRow=WIDTH * 4, rowsPerImage=HEIGHT
+        ),
+        writeSize=extent,
+    )
+    return tex, pixels.tobytes()
+
+
+def expect_raises(exc_type: type, fn, *args) -> None:
+    try:
+        fn(*args)
+    except exc_type:
+        return
+    raise AssertionError(f"Expected {exc_type.__name__}")
+
+
+def test_ring(device: XDevice) -> None:
+    ring = TexReadbackRing(device, WIDTH, HEIGHT, count=2)
+    assert ring.read(ring.unpad) is None
+    tex_a, pix_a = make_texture(device, 0)
+    tex_b, pix_b = make_texture(device, 1)
+    ring.submit(tex_a)
+    ring.submit(tex_b)
+    expect_raises(RuntimeError, ring.submit, tex_a)
+    assert ring.read(ring.unpad, wait=True) == pix_a
+    assert ring.read(ring.unpad, wait=True) == pix_b
+
+    # without device polling (emscripten) nothing can complete the mapping
+    # while read() waits, so waiting must fail rather than hang
+    ring.submit(tex_a)
+    readback._CAN_POLL = False
+    try:
+        expect_raises(RuntimeError, ring.read, ring.unpad, True)
+        assert ring.read(ring.unpad) is None
+    finally:
+        readback._CAN_POLL = True
+    assert ring.read(ring.unpad, wait=True) == pix_a
+
+
+def test_read_future_errors(device: XDevice) -> None:
+    data = bytes(range(16))
+    buf = device.createBufferWithData(data, xg.BufferUsage.MapRead)
+
+    def failing_consumer(view: memoryview) -> bytes:
+        raise ValueError("consumer failed")
+
+    # the failure is reported again by every sync_wait, not just the first
+    future = device.readBufferAsync(buf, 0, len(data), failing_consumer)
+    expect_raises(ValueError, future.sync_wait)
+    expect_raises(ValueError, future.sync_wait)
+
+    # ... and the buffer was unmapped, so it can be read again
+    future = device.readBufferAsync(buf, 0, len(data))
+    assert future.sync_wait() == data
+    assert future.sync_wait() == data
+
+
+def test_no_poll_wait(device: XDevice) -> None:
+    data = bytes(range(16))
+    buf = device.createBufferWithData(data, xg.BufferUsage.MapRead)
+
+    # without device polling (emscripten) synchronous reads must fail rather
+    # than hang; the pending readback can still complete later
+    future = device.readBufferAsync(buf, 0, len(data))
+    wrappers._CAN_POLL = False
+    try:
+        expect_raises(RuntimeError, future.sync_wait)
+    finally:
+        wrappers._CAN_POLL = True
+    assert future.sync_wait() == data
+
+
+def test_read_many(device: XDevice) -> None:
+    textures = [make_texture(device, seed) for seed in range(3)]
+    texs = [tex for tex, _ in textures]
+    expected = [pixels for _, pixels in textures]
+    assert device.readManyTextures(texs) == expected
+
+    # make the second of three readbacks fail
+    calls: List[int] = []
+    real_unpad = wrappers.unpad_rows
+
+    def flaky_unpad(view: memoryview, row_bytes: int, stride: int, rows: int) -> bytes:
+        calls.append(rows)
+        if len(calls) == 2:
+            raise ValueError("readback failed")
+        return real_unpad(view, row_bytes, stride, rows)
+
+    wrappers.unpad_rows = flaky_unpad  # type: ignore
+    try:
+        expect_raises(ValueError, device.readManyTextures, texs)
+    finally:
+        wrappers.unpad_rows = real_unpad
+
+    # the staging buffers of the failed call (all taken from the pool) must
+    # have been destroyed rather than pooled while possibly still mapped
+    assert sum(len(pool) for pool in device._stage_pool.values()) == 0
+    assert device.readManyTextures(texs) == expected
+
+
+def runtest() -> None:
+    device = harness.get_device()
+    test_ring(device)
+    test_read_future_errors(device)
+    test_no_poll_wait(device)
+    test_read_many(device)
+    print("[PASS] Readbacks")
+
+
+if __name__ == "__main__":
+    runtest()
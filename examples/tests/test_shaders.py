@@ -0,0 +1,52 @@
+import hashlib
+import os
+import struct
+import tempfile
+
+import harness
+
+from xgpu.extensions.shaders import SPIRV_MAGIC, _is_valid_spirv, cached_shader
+
+SHADER_SRC = """
+@compute @workgroup_size(1)
+fn main() {}
+"""
+
+
+def write_file(fn: str, data: bytes) -> None:
+    with open(fn, "wb") as dest:
+        dest.write(data)
+
+
+def test_validation(tmpdir: str) -> None:
+    fn = os.path.join(tmpdir, "check.spv")
+    header = struct.pack("<5I", SPIRV_MAGIC, 0x10000, 0, 1, 0)
+    write_file(fn, header)
+    assert _is_valid_spirv(fn)
+    write_file(fn, header[:16])  # truncated
+    assert not _is_valid_spirv(fn)
+    write_file(fn, header + b"\x00")  # not whole words
+    assert not _is_valid_spirv(fn)
+    write_file(fn, b"\x00" * 20)  # wrong magic
+    assert not _is_valid_spirv(fn)
+
+
+def test_corrupt_cache(tmpdir: str) -> None:
+    # a garbage cache entry is discarded and the WGSL compiled instead
+    digest = hashlib.blake2b(SHADER_SRC.encode(), digest_size=16).hexdigest()
+    spv_fn = os.path.join(tmpdir, f"{digest}.spv")
+    write_file(spv_fn, b"not spirv")
+    module = cached_shader(harness.get_device(), SHADER_SRC, cache_dir=tmpdir)
+    assert module.isValid()
+    assert not os.path.exists(spv_fn) or _is_valid_spirv(spv_fn)
+
+
+def runtest() -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        test_validation(tmpdir)
+        test_corrupt_cache(tmpdir)
+    print("[PASS] Shader cache")
+
+
+if __name__ == "__main__":
+    runtest()
@@ -3,18 +3,19 @@ Textured cube
 """
 
 import math
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 
 import numpy as np
-import trimesh
-from example_utils import proj_perspective
+from example_utils import aligned_zeros, proj_perspective
 from numpy.typing import NDArray
 
 import xgpu as xg
 from xgpu.extensions import (
     BinderBuilder,
+    ReleasePool,
     XDevice,
     auto_vertex_layout,
+    get_or_create_sampler,
     get_preferred_format,
 )
 from xgpu.extensions.glfw_window import GLFWWindow
@@ -23,17 +24,30 @@ from xgpu.extensions.standardimage import open_image
 from xgpu.extensions.texloader import TextureData
 
 
-def set_transform(
-    target: NDArray, rot: Tuple[float, float, float], scale: float, pos: NDArray
+def set_transforms_batch(
+    target: NDArray, rots: NDArray, scale: float, positions: NDArray
 ) -> None:
-    # Note: webgpu expects column-major array order
-    r = trimesh.transformations.euler_matrix(rot[0], rot[1], rot[2])
-    target[0:3, 0:3] = r[0:3, 0:3].T * scale
-    target[3, 0:3] = pos
-    target[3, 3] = 1.0
-
-
-def get_source(is_srgb: bool) -> str:
+    """Fill N model matrices at once from (N, 3) euler angles and positions;
+    equivalent to trimesh.transformations.euler_matrix (static xyz) per row.
+    """
+    ca, cb, cc = np.cos(rots).T
+    sa, sb, sc = np.sin(rots).T
+    # Note: webgpu expects column-major array order, so target[:, col, row]
+    target[:, 0, 0] = cb * cc * scale
+    target[:, 0, 1] = cb * sc * scale
+    target[:, 0, 2] = -sb * scale
+    target[:, 1, 0] = (sb * sa * cc - ca * sc) * scale
+    target[:, 1, 1] = (sb * sa * sc + ca * cc) * scale
+    target[:, 1, 2] = cb * sa * scale
+    target[:, 2, 0] = (sb * ca * cc + sa * sc) * scale
+    target[:, 2, 1] = (sb * ca * sc - sa * cc) * scale
+    target[:, 2, 2] = cb * ca * scale
+    target[:, 0:3, 3] = 0.0
+    target[:, 3, 0:3] = positions
+    target[:, 3, 3] = 1.0
+
+
+def get_source(is_srgb: bool, cubecount: int) -> str:
     if is_srgb:
         outcolor = "let outcolor = pow(texcolor.rgb, vec3f(2.2));"
     else:
@@ -42,12 +56,12 @@ def get_source(is_srgb: bool) -> str:
     return """
     struct Uniforms {
     @align(16) view_proj_mat: mat4x4f,
-    @align(16) model_mat: mat4x4f,
     @align(16) color: vec4f,
     }
     @group(0) @binding(0) var<uniform> uniforms: Uniforms;
     @group(0) @binding(1) var tex: texture_2d<f32>;
     @group(0) @binding(2) var samp: sampler;
+    @group(0) @binding(3) var<uniform> model_mats: array<mat4x4f, <CUBECOUNT>>;
 
     struct VertexInput {
         @location(0) pos: vec4f,
@@ -59,8 +73,8 @@ def get_source(is_srgb: bool) -> str:
         @location(1) uv : vec2f,
     };
     @vertex
-    fn vs_main(in: VertexInput) -> VertexOutput {
-        let world_pos = uniforms.model_mat * vec4f(in.pos.xyz, 1.0f);
+    fn vs_main(in: VertexInput, @builtin(instance_index) idx: u32) -> VertexOutput {
+        let world_pos = model_mats[idx] * vec4f(in.pos.xyz, 1.0f);
         let clip_pos = uniforms.view_proj_mat * world_pos;
         let color = uniforms.color;
         let uv = in.uv;
@@ -72,11 +86,11 @@ def get_source(is_srgb: bool) -> str:
         <OUTCOLOR>
         return vec4(in.color.rgb * outcolor, 1.0);
     }
-    """.replace("<OUTCOLOR>", outcolor)
+    """.replace("<OUTCOLOR>", outcolor).replace("<CUBECOUNT>", str(cubecount))
 
 
 class Bindgroup:
-    def __init__(self, device: xg.Device, itemsize: int):
+    def __init__(self, device: xg.Device, models_size: int):
         builder = BinderBuilder(device)
         self.uniforms = builder.add_buffer(
             binding=0,
@@ -90,47 +104,122 @@ class Bindgroup:
             viewdim=xg.TextureViewDimension._2D,
         )
         self.samp = builder.add_sampler(binding=2, visibility=xg.ShaderStage.Fragment)
-        self.sampler = device.createSampler(
+        self.models = builder.add_buffer(
+            binding=3,
+            visibility=xg.ShaderStage.Vertex,
+            type=xg.BufferBindingType.Uniform,
+        )
+        self.sampler = get_or_create_sampler(
+            device,
             minFilter=xg.FilterMode.Linear,
             magFilter=xg.FilterMode.Linear,
             mipmapFilter=xg.MipmapFilterMode.Linear,
-            compare=xg.CompareFunction.Undefined,
         )
         self.binder = builder.complete()
         self.layout = self.binder.layout
-        self.itemsize = itemsize
-
-    def bind(self, buffer: xg.Buffer, idx: int, tex: xg.TextureView) -> xg.BindGroup:
-        self.uniforms.set(buffer, offset=idx * self.itemsize, size=self.itemsize)
+        self.models_size = models_size
+
+    def bind(
+        self,
+        uniforms: xg.Buffer,
+        tex: xg.TextureView,
+        models: xg.Buffer,
+    ) -> xg.BindGroup:
+        self.uniforms.set(uniforms)
         self.tex.set(tex)
         self.samp.set(self.sampler)
+        self.models.set(models, offset=0, size=self.models_size)
         return self.binder.create_bindgroup()
 
 
-def create_geometry_buffers(device: XDevice) -> Tuple[xg.Buffer, xg.Buffer]:
-    raw_verts = []
-    raw_indices = []
-    i0 = 0
-    for axis in range(3):
-        for z in [-1.0, 1.0]:
-            for u in [-1.0, 1.0]:
-                for v in [-1.0, 1.0]:
-                    vert = np.roll([u, v, z], axis)
-                    texu = u * 0.5 + 0.5
-                    texv = v * 0.5 + 0.5
-                    raw_verts.extend([vert[0], vert[1], vert[2], 1.0, texu, texv])
-            if z > 0:
-                raw_indices.extend([i0, i0 + 1, i0 + 3, i0 + 3, i0 + 2, i0])
-            else:
-                raw_indices.extend([i0, i0 + 3, i0 + 1, i0 + 3, i0, i0 + 2])
-            i0 += 4
-
-    vdata = bytes(np.array(raw_verts, dtype=np.float32))
-    idata = bytes(np.array(raw_indices, dtype=np.uint16))
-
-    vbuff = device.createBufferWithData(vdata, xg.BufferUsage.Vertex)
-    ibuff = device.createBufferWithData(idata, xg.BufferUsage.Index)
-    return vbuff, ibuff
+class UniformUploader:
+    """Streams CPU-side uniform data into a GPU buffer through a ring of MapWrite
+    staging buffers, so that the copy is recorded into the frame's own encoder
+    (ordered with the render pass) instead of going through queue.writeBuffer.
+    While the GPU is still copying out of one staging buffer, the next frame
+    writes into another one that has already been re-mapped.
+    """
+
+    def __init__(
+        self, device: XDevice, dest: xg.Buffer, src: NDArray, ring_size: int = 3
+    ):
+        self.device = device
+        self.dest = dest
+        self.src = xg.DataPtr.wrap(src)
+        self.size = src.nbytes
+        self.staging = [
+            device.createBuffer(
+                usage=xg.BufferUsage.MapWrite | xg.BufferUsage.CopySrc,
+                size=self.size,
+                mappedAtCreation=True,
+            )
+            for _ in range(ring_size)
+        ]
+        self.mapped = [True] * ring_size
+        # per-buffer map result, None while a mapping is pending
+        self.status: List[Optional[xg.BufferMapAsyncStatus]] = [
+            xg.BufferMapAsyncStatus.Success
+        ] * ring_size
+        self._map_cbs = [
+            xg.BufferMapAsyncCallback(self._make_map_cb(idx)) for idx in range(ring_size)
+        ]
+        self.cur = 0
+
+    def _make_map_cb(self, idx: int) -> Callable[[xg.BufferMapAsyncStatus], None]:
+        def _on_mapped(status: xg.BufferMapAsyncStatus) -> None:
+            # exceptions raised in callbacks are swallowed, so upload() raises
+            self.status[idx] = status
+            self.mapped[idx] = status == xg.BufferMapAsyncStatus.Success
+
+        return _on_mapped
+
+    def upload(self, encoder: xg.CommandEncoder) -> None:
+        """Copy the CPU data into the next staging buffer and record the GPU-side
+        copy into `dest`
+        """
+        idx = self.cur
+        if self.status[idx] is None:
+            # usually the map completed frames ago and just needs to be reported
+            self.device.poll(wait=False, wrappedSubmissionIndex=None)
+        while self.status[idx] is None:
+            self.device.poll(wait=True, wrappedSubmissionIndex=None)
+        if not self.mapped[idx]:
+            raise RuntimeError(f"Mapping error! {self.status[idx]}")
+        staging = self.staging[idx]
+        staging.getMappedRange(0, self.size).buffer_view()[:] = self.src.buffer_view()
+        staging.unmap()
+        self.mapped[idx] = False
+        encoder.copyBufferToBuffer(staging, 0, self.dest, 0, self.size)
+
+    def remap(self) -> None:
+        """Start re-mapping the staging buffer that was just used, and advance
+        the ring; call after submitting the copy
+        """
+        idx = self.cur
+        self.status[idx] = None
+        self.staging[idx].mapAsync(xg.MapMode.Write, 0, self.size, self._map_cbs[idx])
+        self.cur = (idx + 1) % len(self.staging)
+
+
+def create_geometry_buffers(device: XDevice) -> Tuple[xg.Buffer, int, xg.Buffer, int]:
+    # corners of the two faces at z=-1 and z=+1, as (u, v, z)
+    zz, uu, vv = np.meshgrid([-1.0, 1.0], [-1.0, 1.0], [-1.0, 1.0], indexing="ij")
+    face = np.stack([uu.ravel(), vv.ravel(), zz.ravel()], axis=1)
+    # rotate that pair of faces onto each of the three axes
+    positions = np.concatenate([np.roll(face, axis, axis=1) for axis in range(3)])
+    texcoords = np.tile(face[:, 0:2] * 0.5 + 0.5, (3, 1))
+    verts = np.column_stack([positions, np.ones(len(positions)), texcoords])
+
+    # winding alternates between the z=-1 and z=+1 faces
+    quads = np.array([[0, 3, 1, 3, 0, 2], [0, 1, 3, 3, 2, 0]])
+    indices = np.tile(quads, (3, 1)) + 4 * np.arange(6)[:, None]
+
+    vdata = verts.astype(np.float32)
+    idata = indices.astype(np.uint16)
+
+    vbuff = device.createBufferWithData(xg.DataPtr.wrap(vdata), xg.BufferUsage.Vertex)
+    ibuff = device.createBufferWithData(xg.DataPtr.wrap(idata), xg.BufferUsage.Index)
+    return vbuff, vdata.nbytes, ibuff, idata.nbytes
 
 
 def main() -> None:
@@ -163,22 +252,27 @@ def main() -> None:
         for tex in textures
     ]
 
+    CUBECOUNT = len(texviews)
+
     uniform_align = device.getLimits2().minUniformBufferOffsetAlignment
     print("Alignment requirement:", uniform_align)
+    # uniforms that are shared by all cubes and never change
     UNIFORMS_DTYPE = np.dtype(
         {
-            "names": ["viewproj_mat", "model_mat", "color"],
+            "names": ["viewproj_mat", "color"],
             "formats": [
-                np.dtype((np.float32, (4, 4))),
                 np.dtype((np.float32, (4, 4))),
                 np.dtype((np.float32, 4)),
             ],
-            "offsets": [0, 64, 128],
-            "itemsize": max(uniform_align, 256),
+            "offsets": [0, 64],
+            "itemsize": 80,
         }
     )
+    # the per-frame model matrices are packed tightly (64 bytes each) and
+    # indexed in the shader by instance index
+    MODELS_SIZE = CUBECOUNT * 64
 
-    bind_factory = Bindgroup(device, UNIFORMS_DTYPE.itemsize)
+    bind_factory = Bindgroup(device, MODELS_SIZE)
     pipeline_layout = device.createPipelineLayout(bindGroupLayouts=[bind_factory.layout])
 
     window_tex_format = get_preferred_format(adapter, surface)
@@ -186,7 +280,7 @@ def main() -> None:
 
     window.configure_surface(device, window_tex_format)
 
-    shader_src = get_source("srgb" in window_tex_format.name.lower())
+    shader_src = get_source("srgb" in window_tex_format.name.lower(), CUBECOUNT)
     shader = device.createWGSLShaderModule(code=shader_src, label="colorcube.wgsl")
 
     REPLACE = xg.blendComponent(
@@ -232,77 +326,91 @@ def main() -> None:
     )
     assert render_pipeline.isValid(), "Failed to create pipeline!"
 
-    vbuff, ibuff = create_geometry_buffers(device)
+    vbuff, vsize, ibuff, isize = create_geometry_buffers(device)
 
-    CUBECOUNT = len(texviews)
+    cpu_uniforms = np.zeros(1, dtype=UNIFORMS_DTYPE)
+    cpu_uniforms["viewproj_mat"] = proj_perspective(np.pi / 3.0, 1.0, 0.1, 20.0).T
+    cpu_uniforms["color"] = (1.0, 1.0, 1.0, 1.0)
+    static_ubuff = device.createBufferWithData(
+        xg.DataPtr.wrap(cpu_uniforms), xg.BufferUsage.Uniform
+    )
 
-    draw_ubuff = device.createBuffer(
+    models_ubuff = device.createBuffer(
         usage=xg.BufferUsage.Uniform | xg.BufferUsage.CopyDst,
-        size=UNIFORMS_DTYPE.itemsize * CUBECOUNT,
+        size=MODELS_SIZE,
     )
-    cpu_draw_ubuff = np.zeros(CUBECOUNT, dtype=UNIFORMS_DTYPE)
-    draw_ubuff_staging = xg.DataPtr.wrap(cpu_draw_ubuff)
-
-    projmat = proj_perspective(np.pi / 3.0, 1.0, 0.1, 20.0).T
-    for idx in range(CUBECOUNT):
-        cpu_draw_ubuff[idx]["viewproj_mat"] = projmat
-        cpu_draw_ubuff[idx]["color"] = (1.0, 1.0, 1.0, 1.0)
+    cpu_model_mats = aligned_zeros((CUBECOUNT, 4, 4), dtype=np.float32)
+    assert cpu_model_mats.flags["C_CONTIGUOUS"] and cpu_model_mats.ctypes.data % 16 == 0
+    uploader = UniformUploader(device, models_ubuff, cpu_model_mats)
 
     frame = 0
 
     # we can save a bit of time by premaking all bindgroups
     bgs = [
-        bind_factory.bind(draw_ubuff, idx, texview)
-        for idx, texview in enumerate(texviews)
+        bind_factory.bind(static_ubuff, texview, models_ubuff) for texview in texviews
     ]
 
-    while window.poll():
-        for uidx, xpos in enumerate(np.linspace(-1.0, 1.0, CUBECOUNT)):
-            pos = np.array(
-                [xpos, 0.0, math.sin(frame / 120.0) * 5.0 - 7.0], dtype=np.float32
-            )
-            set_transform(
-                cpu_draw_ubuff[uidx]["model_mat"],
-                (
-                    math.sin(frame * 0.03) * 0.5,
-                    math.sin(frame * 0.04) * 0.5,
-                    frame * 0.02,
-                ),
-                0.9 / CUBECOUNT,
-                pos,
-            )
+    rots = np.zeros((CUBECOUNT, 3), dtype=np.float32)
+    positions = np.zeros((CUBECOUNT, 3), dtype=np.float32)
+    positions[:, 0] = np.linspace(-1.0, 1.0, CUBECOUNT)
 
-        command_encoder = device.createCommandEncoder()
-        queue = device.getQueue()
-        queue.writeBuffer(draw_ubuff, 0, draw_ubuff_staging)
+    # the draw commands never change, so record them once into a bundle
+    bundle_encoder = device.createRenderBundleEncoder(
+        colorFormats=[window_tex_format],
+        depthStencilFormat=xg.TextureFormat.Undefined,
+        sampleCount=1,
+    )
+    bundle_encoder.setPipeline(render_pipeline)
+    bundle_encoder.setVertexBuffer(0, vbuff, 0, vsize)
+    bundle_encoder.setIndexBuffer(ibuff, xg.IndexFormat.Uint16, 0, isize)
+    for idx, bg in enumerate(bgs):
+        bundle_encoder.setBindGroup(0, bg, [])
+        bundle_encoder.drawIndexed(36, 1, 0, 0, idx)
+    bundles = xg.RenderBundleList([bundle_encoder.finish()])
+    bundle_encoder.release()
+
+    queue = device.getQueue()
+
+    # only the view changes from frame to frame
+    color_attachment = xg.renderPassColorAttachment(
+        view=None,
+        depthSlice=0,
+        loadOp=xg.LoadOp.Clear,
+        storeOp=xg.StoreOp.Store,
+        clearValue=xg.color(r=0.5, g=0.5, b=0.5, a=1.0),
+    )
 
-        color_view = window.begin_frame()
+    # per-frame encoders are released together once the frame is presented
+    frame_pool = ReleasePool()
 
-        color_attachment = xg.renderPassColorAttachment(
-            view=color_view,
-            depthSlice=0,
-            loadOp=xg.LoadOp.Clear,
-            storeOp=xg.StoreOp.Store,
-            clearValue=xg.color(r=0.5, g=0.5, b=0.5, a=1.0),
+    while window.poll():
+        positions[:, 2] = math.sin(frame / 120.0) * 5.0 - 7.0
+        rots[:] = (
+            math.sin(frame * 0.03) * 0.5,
+            math.sin(frame * 0.04) * 0.5,
+            frame * 0.02,
         )
-        render_pass = command_encoder.beginRenderPass(colorAttachments=[color_attachment])
+        set_transforms_batch(cpu_model_mats, rots, 0.9 / CUBECOUNT, positions)
 
-        render_pass.setPipeline(render_pipeline)
-        render_pass.setVertexBuffer(0, vbuff, 0, vbuff.getSize())
-        render_pass.setIndexBuffer(ibuff, xg.IndexFormat.Uint16, 0, ibuff.getSize())
+        command_encoder = frame_pool.add(device.createCommandEncoder())
+        uploader.upload(command_encoder)
 
-        for bg in bgs:
-            render_pass.setBindGroup(0, bg, [])
-            render_pass.drawIndexed(36, 1, 0, 0, 0)
+        # acquire the swapchain texture only right before it's needed, so that
+        # any wait for it comes after all other frame work has been done
+        color_attachment.view = window.begin_frame()
+        render_pass = frame_pool.add(
+            command_encoder.beginRenderPass(colorAttachments=[color_attachment])
+        )
 
+        render_pass.executeBundles(bundles)
         render_pass.end()
 
-        queue.submit([command_encoder.finish()])
+        queue.submit([frame_pool.add(command_encoder.finish())])
+        uploader.remap()
 
         window.end_frame(present=True)
 
-        command_encoder.release()
-        render_pass.release()
+        frame_pool.flush()
 
         frame += 1
     print("Window close requested.")
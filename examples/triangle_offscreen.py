@@ -7,6 +7,7 @@ https://github.com/pygfx/wgpu-py/blob/main/examples/triangle.py
 """
 
 import time
+from typing import Any
 
 from PIL import Image
 
@@ -59,8 +60,10 @@ def main() -> None:
     return _main(device)
 
 
-def write_image(filename: str, data: bytes, size: tuple[int, int]) -> None:
-    img = Image.frombytes("RGBA", size, data)
+def write_image(filename: str, data: Any, size: tuple[int, int]) -> None:
+    # frombuffer wraps `data` without copying, so it can be encoded
+    # straight out of the mapped readback buffer
+    img = Image.frombuffer("RGBA", size, data, "raw", "RGBA", 0, 1)
     img.save(filename)
 
 
@@ -117,6 +120,7 @@ def _main(device: XDevice) -> None:
         clearValue=xg.color(r=0.5, g=0.5, b=0.5, a=1.0),
     )
 
+    queue = device.getQueue()
     command_encoder = device.createCommandEncoder()
 
     render_pass = command_encoder.beginRenderPass(colorAttachments=[color_attachment])
@@ -125,12 +129,15 @@ def _main(device: XDevice) -> None:
     render_pass.draw(3, 1, 0, 0)
     render_pass.end()
 
-    device.getQueue().submit([command_encoder.finish()])
+    queue.submit([command_encoder.finish()])
 
     FILENAME = "test.png"
-    texdata = device.readRGBATexture(color_tex)
-    print("Tex data size:", len(texdata))
-    write_image(FILENAME, texdata, (WIDTH, HEIGHT))
+
+    def save(texdata: memoryview) -> None:
+        print("Tex data size:", texdata.nbytes)
+        write_image(FILENAME, texdata, (WIDTH, HEIGHT))
+
+    device.readRGBATextureWith(color_tex, save)
     print(f"Done: saved to {FILENAME}")
 
 
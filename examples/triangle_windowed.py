@@ -6,7 +6,10 @@ https://github.com/pygfx/wgpu-py/blob/main/examples/triangle.py
 
 """
 
+from typing import List
+
 import xgpu as xg
+from xgpu.extensions import ReleasePool, cached_shader
 from xgpu.extensions.glfw_window import GLFWWindow
 
 shader_source = """
@@ -44,6 +47,12 @@ fn fs_main(in: VertexOutput) -> @location(0) vec4f {
 }
 """
 
+_STATUS_NAMES = {v.value: v.name for v in xg.SurfaceGetCurrentTextureStatus}
+_RECONFIGURE_STATUSES = (
+    xg.SurfaceGetCurrentTextureStatus.Outdated,
+    xg.SurfaceGetCurrentTextureStatus.Lost,
+)
+
 
 def main() -> None:
     WIDTH = 1024
@@ -71,7 +80,8 @@ def main() -> None:
 
     window.configure_surface(device, window_tex_format)
 
-    shader = device.createWGSLShaderModule(code=shader_source)
+    # compiled SPIR-V is cached on disk (if naga is installed) for later runs
+    shader = cached_shader(device, shader_source, label="triangle")
     layout = device.createPipelineLayout(bindGroupLayouts=[])
 
     REPLACE = xg.blendComponent(
@@ -104,38 +114,58 @@ def main() -> None:
         fragment=fragment,
     )
 
-    while window.poll():
-        command_encoder = device.createCommandEncoder()
-
-        surf_tex = surface.getCurrentTexture2()
+    # descriptors are built once; only the attachment's view changes per frame
+    view_desc = xg.textureViewDescriptor(
+        format=xg.TextureFormat.Undefined,
+        dimension=xg.TextureViewDimension._2D,
+        mipLevelCount=1,
+        arrayLayerCount=1,
+    )
+    color_attachment = xg.renderPassColorAttachment(
+        view=None,
+        depthSlice=0,
+        loadOp=xg.LoadOp.Clear,
+        storeOp=xg.StoreOp.Store,
+        clearValue=xg.color(r=0.5, g=0.5, b=0.5, a=1.0),
+    )
 
-        color_view = surf_tex.texture.createView(
-            format=xg.TextureFormat.Undefined,
-            dimension=xg.TextureViewDimension._2D,
-            mipLevelCount=1,
-            arrayLayerCount=1,
-        )
+    # per-frame objects are collected here and released together after present
+    frame_pool = ReleasePool()
+    # all of a frame's command buffers are submitted together in one call
+    command_buffers: List[xg.CommandBuffer] = []
+    queue = device.getQueue()
+    surf_tex = xg.SurfaceTexture()
 
-        color_attachment = xg.renderPassColorAttachment(
-            view=color_view,
-            depthSlice=0,
-            loadOp=xg.LoadOp.Clear,
-            storeOp=xg.StoreOp.Store,
-            clearValue=xg.color(r=0.5, g=0.5, b=0.5, a=1.0),
+    while window.poll():
+        # this frame has no work that doesn't need the swapchain texture, so
+        # acquire it first and skip the frame entirely if it isn't usable
+        surface.getCurrentTexture2(out=surf_tex)
+        status = surf_tex.status
+        if status != xg.SurfaceGetCurrentTextureStatus.Success:
+            print("Tex status?", _STATUS_NAMES[status])
+            if status in _RECONFIGURE_STATUSES:
+                window.configure_surface(device, window_tex_format)
+            continue
+        texture = frame_pool.add(surf_tex.texture)
+
+        command_encoder = frame_pool.add(device.createCommandEncoder())
+
+        color_attachment.view = frame_pool.add(texture.createViewFromDesc(view_desc))
+        render_pass = frame_pool.add(
+            command_encoder.beginRenderPass(colorAttachments=[color_attachment])
         )
-        render_pass = command_encoder.beginRenderPass(colorAttachments=[color_attachment])
 
         render_pass.setPipeline(render_pipeline)
         render_pass.draw(3, 1, 0, 0)
         render_pass.end()
 
-        device.getQueue().submit([command_encoder.finish()])
+        command_buffers.append(frame_pool.add(command_encoder.finish()))
+
+        queue.submit(command_buffers)
+        command_buffers.clear()
         surface.present()
 
-        color_view.release()
-        command_encoder.release()
-        render_pass.release()
-        surf_tex.texture.release()
+        frame_pool.flush()
     print("Should exit?")
 
 
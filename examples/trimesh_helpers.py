@@ -1,33 +1,50 @@
 # ruff: noqa
 
+import functools
+from math import cos, sin
+
 import numpy as np
 from numpy.typing import NDArray
 from typing import Tuple
 import trimesh
 import xgpu
-from xgpu.extensions import auto_vertex_layout
+
+VFMT_DTYPE = np.dtype(
+    {
+        "names": ["position", "color", "normal", "texcoord"],
+        "formats": [
+            np.dtype((np.float32, 3)),
+            np.dtype((np.float32, 3)),
+            np.dtype((np.float32, 3)),
+            np.dtype((np.float32, 2)),
+        ],
+        "offsets": [0, 12, 24, 36],
+        "itemsize": 44,
+    }
+)
 
 def euler_matrix(rx: float, ry: float, rz: float) -> NDArray:
-    return trimesh.transformations.euler_matrix(rx, ry, rz)[0:3, 0:3]
+    """Same as trimesh.transformations.euler_matrix(rx, ry, rz)[0:3, 0:3],
+    but using scalar math trig rather than numpy ufuncs on scalars
+    """
+    ca, sa = cos(rx), sin(rx)
+    cb, sb = cos(ry), sin(ry)
+    cc, sc = cos(rz), sin(rz)
+    return np.array(
+        [
+            [cb * cc, sb * sa * cc - ca * sc, sb * ca * cc + sa * sc],
+            [cb * sc, sb * sa * sc + ca * cc, sb * ca * sc - sa * cc],
+            [-sb, cb * sa, cb * ca],
+        ]
+    )
 
 def mesh_to_struct(mesh: trimesh.Trimesh) -> Tuple[NDArray, NDArray]:
     """
     Convert a trimesh to expected vertex format
-    """
 
-    VFMT_DTYPE = np.dtype(
-        {
-            "names": ["position", "color", "normal", "texcoord"],
-            "formats": [
-                np.dtype((np.float32, 3)),
-                np.dtype((np.float32, 3)),
-                np.dtype((np.float32, 3)),
-                np.dtype((np.float32, 2)),
-            ],
-            "offsets": [0, 12, 24, 36],
-            "itemsize": 44,
-        }
-    )
+    Both returned arrays are C-contiguous, so they can be uploaded with a
+    single memcpy via DataPtr.wrap (e.g., XDevice.createBufferWithData).
+    """
 
     # todo : cheaper smoooth shading
     vertices = mesh.vertices  # mesh.vertices[mesh.faces.ravel()]
@@ -38,24 +55,38 @@ def mesh_to_struct(mesh: trimesh.Trimesh) -> Tuple[NDArray, NDArray]:
     count = len(vertices)
     # colors = np.full((count, 3), [0.9, 0.9, 0.9])
 
-    vertex_data = np.zeros(count, dtype=VFMT_DTYPE)
-    vertex_data["position"] = vertices[:, 0:3]
-    vertex_data["normal"] = normals[:, 0:3]
-    # vertex_data["color"] = colors[:, 0:3]
+    # fill a plain (count, 11) float array (position, color, normal, texcoord)
+    # with contiguous block copies, then reinterpret it as the struct dtype
+    packed = np.zeros((count, 11), dtype=np.float32)
+    packed[:, 0:3] = vertices[:, 0:3]
+    packed[:, 6:9] = normals[:, 0:3]
+    # packed[:, 3:6] = colors[:, 0:3]
+    vertex_data = packed.view(VFMT_DTYPE).reshape(count)
 
-    face_data = faces.astype(np.uint32).flatten()
+    face_data = faces.astype(np.uint32, copy=False).ravel()
 
+    assert vertex_data.flags["C_CONTIGUOUS"] and face_data.flags["C_CONTIGUOUS"]
     return vertex_data, face_data
 
 
+@functools.lru_cache(maxsize=1)
 def simple_vertex_layout() -> xgpu.VertexBufferLayout:
-    return auto_vertex_layout(
-        [
-            xgpu.VertexFormat.Float32x3,  # position
-            xgpu.VertexFormat.Float32x3,  # color
-            xgpu.VertexFormat.Float32x3,  # normal
-            xgpu.VertexFormat.Float32x2,  # texcoord
-        ]
+    # offsets come straight from VFMT_DTYPE, so the layout always matches
+    # the data produced by mesh_to_struct
+    return xgpu.vertexBufferLayout(
+        arrayStride=VFMT_DTYPE.itemsize,
+        stepMode=xgpu.VertexStepMode.Vertex,
+        attributes=[
+            xgpu.vertexAttribute(format=fmt, offset=VFMT_DTYPE.fields[name][1], shaderLocation=loc)
+            for loc, (name, fmt) in enumerate(
+                [
+                    ("position", xgpu.VertexFormat.Float32x3),
+                    ("color", xgpu.VertexFormat.Float32x3),
+                    ("normal", xgpu.VertexFormat.Float32x3),
+                    ("texcoord", xgpu.VertexFormat.Float32x2),
+                ]
+            )
+        ],
     )
 
 def load_mesh_simple(fn: str) -> Tuple[NDArray, NDArray, xgpu.VertexBufferLayout]:
@@ -1,21 +1,54 @@
 from .helpers import (
     create_default_view,
     enable_logging,
+    get_adapter_async,
     get_device,
+    get_device_async,
+    get_or_create_sampler,
     get_preferred_format,
+    reset_cache,
     startup,
 )
-from .wrappers import BinderBuilder, XAdapter, XDevice, XSurface, auto_vertex_layout
+from .readback import (
+    FixedSizeRGBAReadback,
+    PipelinedTextureReadback,
+    TexReadbackRing,
+)
+from .shaders import cached_shader, precompiled_shader
+from .wrappers import (
+    BinderBuilder,
+    ReleasePool,
+    XAdapter,
+    XDevice,
+    XSurface,
+    XTexture,
+    auto_vertex_layout,
+    buildLayoutEntries,
+    makeBindGroupLayout,
+)
 
 __all__ = [
     "get_device",
+    "get_adapter_async",
+    "get_device_async",
     "startup",
     "enable_logging",
     "create_default_view",
     "get_preferred_format",
+    "get_or_create_sampler",
+    "reset_cache",
+    "precompiled_shader",
+    "cached_shader",
     "BinderBuilder",
+    "ReleasePool",
+    "TexReadbackRing",
+    "PipelinedTextureReadback",
+    "FixedSizeRGBAReadback",
     "XAdapter",
     "XDevice",
     "XSurface",
+    "XTexture",
     "auto_vertex_layout",
+    "buildLayoutEntries",
+    "makeBindGroupLayout",
 ]
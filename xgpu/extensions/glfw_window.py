@@ -2,6 +2,8 @@
 # Largely adapted from https://github.com/pygfx/wgpu-py/blob/main/wgpu/gui/glfw.py
 # wgpu-py: BSD-2 license
 
+import functools
+import logging
 import os
 import sys
 
@@ -17,10 +19,19 @@ from xgpu import (
 )
 from xgpu.extensions import XDevice, XSurface
 
+log = logging.getLogger(__name__)
 
+# one of "win", "linux", "darwin" or "other"; sys.platform can't change at runtime
+_PLATFORM = next(
+    (p for p in ("win", "linux", "darwin") if sys.platform.startswith(p)), "other"
+)
+
+
+@functools.lru_cache(maxsize=None)
 def is_wayland():
+    # the session type can't change while we're running, so this is memoized
     # Do checks to prevent pitfalls on hybrid Xorg/Wayland systems
-    if not sys.platform.startswith("linux"):
+    if _PLATFORM != "linux":
         return False
     wayland = "wayland" in os.getenv("XDG_SESSION_TYPE", "").lower()
     if wayland and not hasattr(glfw, "get_wayland_window"):
@@ -52,12 +63,21 @@ WINDOW_GETTERS = [
 ]
 
 
-def get_handles(window):
+def _resolve_platform_getters():
     for prefix, maker in WINDOW_GETTERS:
         if sys.platform.lower().startswith(prefix):
-            win_getter, display_getter = maker()
-            return (win_getter(window), display_getter())
-    raise RuntimeError(f"Coulnd't get window handles for platform {sys.platform}")
+            return maker()
+    return (None, None)
+
+
+# resolved once at import; the platform doesn't change at runtime
+_WIN_GETTER, _DISPLAY_GETTER = _resolve_platform_getters()
+
+
+def get_handles(window):
+    if _WIN_GETTER is None:
+        raise RuntimeError(f"Coulnd't get window handles for platform {sys.platform}")
+    return (_WIN_GETTER(window), _DISPLAY_GETTER())
 
 
 class GLFWWindow:
@@ -66,7 +86,8 @@ class GLFWWindow:
         self.height = h
         if is_wayland():
             glfw.init_hint(glfw.PLATFORM, glfw.PLATFORM_WAYLAND)
-        print("GLFW init:", glfw.init())
+        glfw_ok = glfw.init()
+        log.debug("GLFW init: %s", glfw_ok)
         glfw.window_hint(glfw.CLIENT_API, glfw.NO_API)
         # TODO: allow resizing after bother to deal with surface changes
         glfw.window_hint(glfw.RESIZABLE, False)
@@ -76,14 +97,29 @@ class GLFWWindow:
             glfw.window_hint(glfw.FOCUSED, False)  # prevent Wayland focus error
         self.window = glfw.create_window(w, h, title, None, None)
         self.phys_width, self.phys_height = glfw.get_framebuffer_size(self.window)
-        print("FB size:", self.phys_width, self.phys_height)
+        log.debug("FB size: %d %d", self.phys_width, self.phys_height)
         cscale = glfw.get_window_content_scale(self.window)
-        print("Content scale:", cscale[0], cscale[1])
+        log.debug("Content scale: %s %s", cscale[0], cscale[1])
         (self.window_handle, self.display_id) = get_handles(self.window)
-        print("window:", self.window_handle)
-        print("display:", self.display_id)
+        log.debug("window: %s", self.window_handle)
+        log.debug("display: %s", self.display_id)
+        # cast once; reused whenever a surface descriptor is built
+        self._window_voidptr = xgpu.VoidPtr.raw_cast(self.window_handle)
+        self._display_voidptr = xgpu.VoidPtr.raw_cast(self.display_id)
         self._surface = None
         self.depth_buffer = None
+        # filled in place each frame by begin_frame
+        self._surf_tex = xgpu.SurfaceTexture()
+        self._cur_surf_tex = None
+        self._cur_tex = None
+        self._cur_surf_view = None
+        # the surface texture changes every frame, but its view descriptor doesn't
+        self._view_desc = xgpu.textureViewDescriptor(
+            format=xgpu.TextureFormat.Undefined,
+            dimension=xgpu.TextureViewDimension._2D,
+            mipLevelCount=1,
+            arrayLayerCount=1,
+        )
         glfw.set_key_callback(self.window, self.keyboard_callback)
         glfw.set_cursor_pos_callback(self.window, self.mouse_callback)
         glfw.set_window_size_callback(self.window, self.resize_callback)
@@ -115,7 +151,7 @@ class GLFWWindow:
         format=xgpu.TextureFormat.BGRA8Unorm,
         depth_format=xgpu.TextureFormat.Depth24Plus,
     ):
-        print("Configuring surface?")
+        log.debug("Configuring surface?")
         if self._surface is None:
             return
         self._surface.configure(
@@ -136,7 +172,7 @@ class GLFWWindow:
             format=depth_format,
             viewFormats=[depth_format],
         )
-        print("Configured surface?")
+        log.debug("Configured surface?")
 
     def get_depth_buffer(self) -> xgpu.Texture:
         assert (
@@ -145,68 +181,76 @@ class GLFWWindow:
         return self.depth_buffer
 
     def get_surface(self, instance: Instance) -> XSurface:
-        print("Getting surface?")
+        log.debug("Getting surface?")
         if self._surface is not None:
             return self._surface
         desc = self.get_surface_descriptor()
         self._surface = XSurface(instance.createSurfaceFromDesc(desc))
-        print("Got surface.")
+        log.debug("Got surface.")
         return self._surface
 
     def get_surface_descriptor(self) -> SurfaceDescriptor:
-        if sys.platform.startswith("win"):
-            inner = xgpu.surfaceDescriptorFromWindowsHWND(
-                hinstance=xgpu.VoidPtr.NULL,
-                hwnd=xgpu.VoidPtr.raw_cast(self.window_handle),
+        maker = self._SURFACE_DESC_MAKERS.get(_PLATFORM)
+        if maker is None:
+            raise RuntimeError("Unsupported windowing platform")
+        inner = maker(self)
+        return surfaceDescriptor(nextInChain=ChainedStruct([inner]))
+
+    def _win_surface_desc(self):
+        return xgpu.surfaceDescriptorFromWindowsHWND(
+            hinstance=xgpu.VoidPtr.NULL,
+            hwnd=self._window_voidptr,
+        )
+
+    def _linux_surface_desc(self):
+        if is_wayland():
+            log.debug("WAYLAND?")
+            return xgpu.surfaceDescriptorFromWaylandSurface(
+                display=self._display_voidptr,
+                surface=self._window_voidptr,
             )
-        elif sys.platform.startswith("linux"):
-            if is_wayland():
-                print("WAYLAND?")
-                inner = xgpu.surfaceDescriptorFromWaylandSurface(
-                    display=xgpu.VoidPtr.raw_cast(self.display_id),
-                    surface=xgpu.VoidPtr.raw_cast(self.window_handle),
-                )
-            else:
-                print("XLIB?")
-                inner = xgpu.surfaceDescriptorFromXlibWindow(
-                    display=xgpu.VoidPtr.raw_cast(self.display_id),
-                    window=self.window_handle,
-                )
-        elif sys.platform.startswith("darwin"):
-            import ctypes
-
-            from rubicon.objc.api import ObjCClass, ObjCInstance  # type: ignore
-
-            window = ctypes.c_void_p(self.window_handle)
-
-            cw = ObjCInstance(window)
-            cv = cw.contentView
-
-            if cv.layer and cv.layer.isKindOfClass(ObjCClass("CAMetalLayer")):
-                # No need to create a metal layer again
-                metal_layer = cv.layer
-            else:
-                metal_layer = ObjCClass("CAMetalLayer").layer()
-                cv.setLayer(metal_layer)
-                cv.setWantsLayer(True)
-
-            inner = xgpu.surfaceDescriptorFromMetalLayer(
-                layer=xgpu.VoidPtr.raw_cast(metal_layer.ptr.value)
+        else:
+            log.debug("XLIB?")
+            return xgpu.surfaceDescriptorFromXlibWindow(
+                display=self._display_voidptr,
+                window=self.window_handle,
             )
+
+    def _darwin_surface_desc(self):
+        import ctypes
+
+        from rubicon.objc.api import ObjCClass, ObjCInstance  # type: ignore
+
+        window = ctypes.c_void_p(self.window_handle)
+
+        cw = ObjCInstance(window)
+        cv = cw.contentView
+
+        if cv.layer and cv.layer.isKindOfClass(ObjCClass("CAMetalLayer")):
+            # No need to create a metal layer again
+            metal_layer = cv.layer
         else:
-            raise RuntimeError("Unsupported windowing platform")
+            metal_layer = ObjCClass("CAMetalLayer").layer()
+            cv.setLayer(metal_layer)
+            cv.setWantsLayer(True)
 
-        return surfaceDescriptor(nextInChain=ChainedStruct([inner]))
+        return xgpu.surfaceDescriptorFromMetalLayer(
+            layer=xgpu.VoidPtr.raw_cast(metal_layer.ptr.value)
+        )
+
+    _SURFACE_DESC_MAKERS = {
+        "win": _win_surface_desc,
+        "linux": _linux_surface_desc,
+        "darwin": _darwin_surface_desc,
+    }
 
     def begin_frame(self) -> TextureView:
         assert self._surface is not None, "Cannot begin_frame: no surface created!"
-        self._cur_surf_tex = self._surface.getCurrentTexture2()
-        self._cur_surf_view = self._cur_surf_tex.texture.createView(
-            format=xgpu.TextureFormat.Undefined,
-            dimension=xgpu.TextureViewDimension._2D,
-            mipLevelCount=1,
-            arrayLayerCount=1,
-        )
+        self._cur_surf_tex = self._surface.getCurrentTexture2(out=self._surf_tex)
+        # .texture makes a new (ref-counted) wrapper on each access, so take one
+        # and use it both for the view and the release in end_frame
+        self._cur_tex = self._cur_surf_tex.texture
+        self._cur_surf_view = self._cur_tex.createViewFromDesc(self._view_desc)
         return self._cur_surf_view
 
     def end_frame(self, present=True):
@@ -216,6 +260,7 @@ class GLFWWindow:
         if self._cur_surf_view is not None:
             self._cur_surf_view.release()
             self._cur_surf_view = None
-        if self._cur_surf_tex is not None:
-            self._cur_surf_tex.texture.release()
-            self._cur_surf_tex = None
+        if self._cur_tex is not None:
+            self._cur_tex.release()
+            self._cur_tex = None
+        self._cur_surf_tex = None
@@ -1,8 +1,14 @@
+import asyncio
+import logging
+import threading
 import time
-from typing import Callable, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from .. import bindings as xg
-from .wrappers import XAdapter, XDevice, XSurface
+from .shaders import _module_cache
+from .wrappers import XAdapter, XDevice, XSurface, XTexture
+
+log = logging.getLogger(__name__)
 
 
 def maybe_chain(item: Optional[xg.Chainable] = None) -> Optional[xg.ChainedStruct]:
@@ -21,7 +27,7 @@ def enable_logging(
         callback = _log_cb
 
     log_cb = xg.LogCallback(callback)
-    print("Enabling logging?")
+    log.debug("Enabling logging")
     xg.setLogCallback(log_cb)
     xg.setLogLevel(level)
 
@@ -43,6 +49,23 @@ def get_instance(
     return xg.createInstance(nextInChain=maybe_chain(extras))
 
 
+# memoized get_adapter/get_device results; entries also hold the objects whose
+# ids make up the key, so that those ids can't be reused while cached
+_adapter_cache: Dict[Tuple[Any, ...], Tuple[Any, XAdapter, xg.Instance]] = {}
+_device_cache: Dict[Tuple[Any, ...], Tuple[Any, XDevice]] = {}
+
+
+def reset_cache() -> None:
+    """Forget memoized adapters, devices, surface formats, samplers and
+    precompiled shader modules (e.g., between tests, or after releasing
+    surfaces), so that none of them keep old devices alive"""
+    _adapter_cache.clear()
+    _device_cache.clear()
+    _preferred_formats.clear()
+    _sampler_cache.clear()
+    _module_cache.clear()
+
+
 def get_adapter(
     instance: Optional[xg.Instance] = None,
     power: xg.PowerPreference = xg.PowerPreference.HighPerformance,
@@ -50,46 +73,115 @@ def get_adapter(
     timeout: float = 60.0,
 ) -> Tuple[XAdapter, xg.Instance]:
     """
-    Get an adapter, blocking up to `timeout` seconds
+    Get an adapter, blocking up to `timeout` seconds.
+    Results are memoized per (instance, power, surface); see reset_cache.
     """
-
+    key = (id(instance), power, id(surface))
+    entry = _adapter_cache.get(key)
+    if entry is None:
+        adapter, instance_out = _request_adapter(instance, power, surface, timeout)
+        entry = ((instance, surface), adapter, instance_out)
+        _adapter_cache[key] = entry
+    return entry[1], entry[2]
+
+
+def _request_adapter(
+    instance: Optional[xg.Instance],
+    power: xg.PowerPreference,
+    surface: Optional[xg.Surface],
+    timeout: float,
+) -> Tuple[XAdapter, xg.Instance]:
     # will be populated by a callback
-    stash: List[Optional[Tuple[xg.RequestAdapterStatus, xg.Adapter, str]]] = [None]
+    result: Optional[Tuple[xg.RequestAdapterStatus, xg.Adapter, str]] = None
+    done = threading.Event()
 
     def adapterCB(status: xg.RequestAdapterStatus, adapter: xg.Adapter, msg: str) -> None:
-        print("Got adapter with msg:", msg, ", status:", status.name)
-        stash[0] = (status, adapter, msg)
+        nonlocal result
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Got adapter with msg: %s, status: %s", msg, status.name)
+        result = (status, adapter, msg)
+        done.set()
 
     cb = xg.InstanceRequestAdapterCallback(adapterCB)
 
     if instance is None:
         instance = get_instance()
-    instance.requestAdapter(
-        xg.requestAdapterOptions(
-            powerPreference=power,
-            backendType=xg.BackendType.Undefined,
-            forceFallbackAdapter=False,
-            compatibleSurface=surface,
-        ),
-        cb,
+    instance.requestAdapter(_adapter_options(power, surface), cb)
+
+    # wgpu-native usually invokes the callback before requestAdapter returns,
+    # in which case this doesn't wait at all; otherwise keep ticking the
+    # instance so that implementations which need it can deliver the callback
+    deadline = time.monotonic() + timeout
+    while not done.wait(0.001) and time.monotonic() < deadline:
+        instance.processEvents()
+    got_adapter = done.is_set()
+    cb.remove()  # one-shot: don't leave it registered in the callback map
+    if not got_adapter or result is None:
+        raise TimeoutError(f"Timed out getting adapter after {timeout:0.2f}s!")
+
+    status, adapter, msg = result
+    result = None  # avoid keeping around a GC reference!
+
+    if status != xg.RequestAdapterStatus.Success:
+        raise RuntimeError(
+            f"Failed to get adapter, status=`{status.name}`, message:'{msg}'"
+        )
+
+    return XAdapter(adapter, instance), instance
+
+
+def _adapter_options(
+    power: xg.PowerPreference, surface: Optional[xg.Surface]
+) -> xg.RequestAdapterOptions:
+    return xg.requestAdapterOptions(
+        powerPreference=power,
+        backendType=xg.BackendType.Undefined,
+        forceFallbackAdapter=False,
+        compatibleSurface=surface,
     )
 
-    deadline = time.time() + timeout
-    while stash[0] is None:
-        time.sleep(0.1)
-        if time.time() > deadline:
-            raise TimeoutError(f"Timed out getting adapter after {timeout:0.2f}s!")
 
-    # we have exited the loop without raising
-    status, adapter, msg = stash[0]
-    stash[0] = None  # avoid keeping around a GC reference!
+async def get_adapter_async(
+    instance: Optional[xg.Instance] = None,
+    power: xg.PowerPreference = xg.PowerPreference.HighPerformance,
+    surface: Optional[xg.Surface] = None,
+    timeout: float = 60.0,
+) -> Tuple[XAdapter, xg.Instance]:
+    """
+    Like get_adapter (but not memoized), as a coroutine: awaiting it lets other
+    tasks (e.g., asset loading) run while the adapter is acquired.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
 
+    def adapterCB(status: xg.RequestAdapterStatus, adapter: xg.Adapter, msg: str) -> None:
+        # may be called from another thread
+        loop.call_soon_threadsafe(fut.set_result, (status, adapter, msg))
+
+    cb = xg.InstanceRequestAdapterCallback(adapterCB)
+    if instance is None:
+        instance = get_instance()
+    instance.requestAdapter(_adapter_options(power, surface), cb)
+    try:
+        deadline = time.monotonic() + timeout
+        while not fut.done():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out getting adapter after {timeout:0.2f}s!")
+            instance.processEvents()
+            await asyncio.sleep(0.001)
+    finally:
+        cb.remove()
+
+    status, adapter, msg = fut.result()
     if status != xg.RequestAdapterStatus.Success:
         raise RuntimeError(
             f"Failed to get adapter, status=`{status.name}`, message:'{msg}'"
         )
+    return XAdapter(adapter, instance), instance
 
-    return XAdapter(adapter), instance
+
+# memoized results of get_preferred_format, keyed on (adapter, surface, prefer_srgb)
+_preferred_formats: Dict[Tuple[int, int, bool], xg.TextureFormat] = {}
 
 
 def get_preferred_format(
@@ -97,16 +189,58 @@ def get_preferred_format(
 ) -> xg.TextureFormat:
     """
     Pick a texture format compatible with a surface.
+    The result is cached, so this is cheap to call again (e.g., on resize).
     """
+    key = (id(adapter), id(surface), prefer_srgb)
+    fmt = _preferred_formats.get(key)
+    if fmt is None:
+        fmt = _query_preferred_format(adapter, surface, prefer_srgb)
+        _preferred_formats[key] = fmt
+    return fmt
+
+
+_SRGB_FORMATS = frozenset(f for f in xg.TextureFormat if f.name.endswith("Srgb"))
+
+
+def _query_preferred_format(
+    adapter: xg.Adapter, surface: xg.Surface, prefer_srgb: bool
+) -> xg.TextureFormat:
     caps = surface.getCapabilities(adapter=adapter)
     assert len(caps.formats) > 0, "Surface has zero supported formats!"
     if prefer_srgb:
         for fmt in caps.formats:
-            if fmt.name.endswith("Srgb"):
+            if fmt in _SRGB_FORMATS:
                 return fmt
     return caps.formats[0]
 
 
+def _adapter_features(adapter: xg.Adapter) -> List[xg.FeatureName]:
+    if isinstance(adapter, XAdapter):
+        return adapter.getFeatures2()
+    return adapter.enumerateFeatures()
+
+
+def _adapter_limits(adapter: xg.Adapter) -> xg.RequiredLimits:
+    if isinstance(adapter, XAdapter):
+        return adapter.getRequiredLimits2()
+    supported = xg.SupportedLimits()
+    adapter.getLimits(supported)
+    return xg.requiredLimits(limits=supported.limits)
+
+
+def _deviceLostCB(reason: xg.DeviceLostReason, msg: str) -> None:
+    log.warning("Lost device!: %s %s", reason, msg)
+
+
+def _errorCB(reason: xg.ErrorType, msg: str) -> None:
+    log.error("Uncaptured error!: %s %s", reason, msg)
+
+
+# these don't capture any per-device state, so one registration serves all devices
+_device_lost_cb = xg.DeviceLostCallback(_deviceLostCB)
+_error_cb = xg.ErrorCallback(_errorCB)
+
+
 def get_device(
     adapter: xg.Adapter,
     features: Optional[List[xg.FeatureName]] = None,
@@ -115,60 +249,116 @@ def get_device(
 ) -> XDevice:
     """
     Get a device, blocking up to `timeout` seconds.
+    Results are memoized per (adapter, features, limits); see reset_cache.
     """
+    feature_key = None if features is None else frozenset(int(f) for f in features)
+    key = (id(adapter), feature_key, id(limits))
+    entry = _device_cache.get(key)
+    if entry is None:
+        entry = ((adapter, limits), _request_device(adapter, features, limits, timeout))
+        _device_cache[key] = entry
+    return entry[1]
+
 
+def _request_device(
+    adapter: xg.Adapter,
+    features: Optional[List[xg.FeatureName]],
+    limits: Optional[xg.RequiredLimits],
+    timeout: float,
+) -> XDevice:
     # collect the device from a callback
-    stash: List[Optional[Tuple[xg.RequestDeviceStatus, xg.Device, str]]] = [None]
+    result: Optional[Tuple[xg.RequestDeviceStatus, xg.Device, str]] = None
+    done = threading.Event()
 
     def deviceCB(status: xg.RequestDeviceStatus, device: xg.Device, msg: str) -> None:
-        print("Got device with msg:", msg, ", status:", status.name)
+        nonlocal result
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Got device with msg: %s, status: %s", msg, status.name)
+        result = (status, device, msg)
+        done.set()
+
+    cb = xg.AdapterRequestDeviceCallback(deviceCB)
+
+    adapter.requestDevice(_device_descriptor(adapter, features, limits), cb)
+
+    # as with the adapter, this is normally already set by the time we get here;
+    # otherwise tick the adapter's instance (if known) while waiting
+    instance = adapter.instance if isinstance(adapter, XAdapter) else None
+    deadline = time.monotonic() + timeout
+    while not done.wait(0.001) and time.monotonic() < deadline:
+        if instance is not None:
+            instance.processEvents()
+    got_device = done.is_set()
+    cb.remove()
+    if not got_device or result is None:
+        raise TimeoutError(f"Timed out getting device after {timeout:0.2f}s!")
+
+    status, device, msg = result
+    result = None  # avoid keeping around a GC reference!
 
-        stash[0] = (status, device, msg)
+    if status != xg.RequestDeviceStatus.Success:
+        raise RuntimeError(
+            f"Failed to get device, status=`{status.name}`, message:'{msg}'"
+        )
 
-    def deviceLostCB(reason: xg.DeviceLostReason, msg: str) -> None:
-        print("Lost device!:", reason, msg)
+    return XDevice(device)
 
-    def errorCB(reason: xg.ErrorType, msg: str) -> None:
-        print("Uncaptured error!:", reason, msg)
 
+def _device_descriptor(
+    adapter: xg.Adapter,
+    features: Optional[List[xg.FeatureName]],
+    limits: Optional[xg.RequiredLimits],
+) -> xg.DeviceDescriptor:
     if features is None:
-        print("Requesting all available features")
-        features = adapter.enumerateFeatures()
+        log.debug("Requesting all available features")
+        features = _adapter_features(adapter)
 
     if limits is None:
-        print("Requesting maximal supported limits")
-        supported = xg.SupportedLimits()
-        adapter.getLimits(supported)
-        limits = xg.requiredLimits(limits=supported.limits)
-
-    adapter.requestDevice(
-        xg.deviceDescriptor(
-            requiredFeatures=features,
-            requiredLimits=limits,
-            defaultQueue=xg.queueDescriptor(),
-            deviceLostCallback=xg.DeviceLostCallback(deviceLostCB),
-            uncapturedErrorCallbackInfo=xg.uncapturedErrorCallbackInfo(
-                callback=xg.ErrorCallback(errorCB)
-            ),
-        ),
-        xg.AdapterRequestDeviceCallback(deviceCB),
+        log.debug("Requesting maximal supported limits")
+        limits = _adapter_limits(adapter)
+
+    return xg.deviceDescriptor(
+        requiredFeatures=features,
+        requiredLimits=limits,
+        defaultQueue=xg.queueDescriptor(),
+        deviceLostCallback=_device_lost_cb,
+        uncapturedErrorCallbackInfo=xg.uncapturedErrorCallbackInfo(callback=_error_cb),
     )
 
-    deadline = time.time() + timeout
-    while stash[0] is None:
-        time.sleep(0.1)
-        if time.time() > deadline:
-            raise TimeoutError(f"Timed out getting device after {timeout:0.2f}s!")
 
-    # we have exited the loop without raising
-    status, device, msg = stash[0]
-    stash[0] = None  # avoid keeping around a GC reference!
+async def get_device_async(
+    adapter: xg.Adapter,
+    features: Optional[List[xg.FeatureName]] = None,
+    limits: Optional[xg.RequiredLimits] = None,
+    timeout: float = 60,
+) -> XDevice:
+    """Like get_device (but not memoized), as a coroutine; see get_adapter_async"""
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def deviceCB(status: xg.RequestDeviceStatus, device: xg.Device, msg: str) -> None:
+        loop.call_soon_threadsafe(fut.set_result, (status, device, msg))
+
+    cb = xg.AdapterRequestDeviceCallback(deviceCB)
+    adapter.requestDevice(_device_descriptor(adapter, features, limits), cb)
+    instance = adapter.instance if isinstance(adapter, XAdapter) else None
+    try:
+        deadline = time.monotonic() + timeout
+        while not fut.done():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Timed out getting device after {timeout:0.2f}s!")
+            if instance is not None:
+                instance.processEvents()
+            await asyncio.sleep(0.001)
+    finally:
+        cb.remove()
+
+    status, device, msg = fut.result()
 
     if status != xg.RequestDeviceStatus.Success:
         raise RuntimeError(
             f"Failed to get device, status=`{status.name}`, message:'{msg}'"
         )
-
     return XDevice(device)
 
 
@@ -185,10 +375,48 @@ def startup(
     return instance, adapter, device, surface
 
 
-def create_default_view(tex: xg.Texture) -> xg.TextureView:
-    return tex.createView(
-        format=xg.TextureFormat.Undefined,
-        dimension=xg.TextureViewDimension.Undefined,
-        mipLevelCount=tex.getMipLevelCount(),
-        arrayLayerCount=tex.getDepthOrArrayLayers(),
-    )
+# default view descriptors, keyed on (mip levels, array layers)
+_default_view_descs: Dict[Tuple[int, int], xg.TextureViewDescriptor] = {}
+
+
+def create_default_view(tex: Union[xg.Texture, XTexture]) -> xg.TextureView:
+    if isinstance(tex, XTexture):
+        key = (tex.mip_levels, tex.array_layers)
+    else:
+        key = (tex.getMipLevelCount(), tex.getDepthOrArrayLayers())
+    desc = _default_view_descs.get(key)
+    if desc is None:
+        desc = xg.textureViewDescriptor(
+            format=xg.TextureFormat.Undefined,
+            dimension=xg.TextureViewDimension.Undefined,
+            mipLevelCount=key[0],
+            arrayLayerCount=key[1],
+        )
+        _default_view_descs[key] = desc
+    return tex.createViewFromDesc(desc)
+
+
+# samplers created through get_or_create_sampler, keyed on (device, descriptor);
+# the device is kept alongside the sampler so that its id can't be reused
+_sampler_cache: Dict[Tuple[int, Tuple[Tuple[str, Any], ...]], Tuple[xg.Device, xg.Sampler]] = {}
+
+
+def get_or_create_sampler(device: xg.Device, **desc: Any) -> xg.Sampler:
+    """
+    Get a sampler matching the descriptor (same keyword arguments as
+    Device.createSampler), reusing a previously created one if possible.
+    """
+    desc.setdefault("compare", xg.CompareFunction.Undefined)
+    if desc.get("maxAnisotropy", 1) > 1 and not (
+        desc.get("magFilter") == xg.FilterMode.Linear
+        and desc.get("minFilter") == xg.FilterMode.Linear
+        and desc.get("mipmapFilter") == xg.MipmapFilterMode.Linear
+    ):
+        # anisotropic filtering is only valid with all-linear filtering
+        desc["maxAnisotropy"] = 1
+    key = (id(device), tuple(sorted(desc.items())))
+    entry = _sampler_cache.get(key)
+    if entry is None:
+        entry = (device, device.createSampler(**desc))
+        _sampler_cache[key] = entry
+    return entry[1]
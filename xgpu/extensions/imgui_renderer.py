@@ -1,4 +1,5 @@
 # ruff: noqa
+import logging
 import os
 from typing import List, Optional, Tuple
 
@@ -11,19 +12,42 @@ from .. import bindings as xg
 from .glfw_window import GLFWWindow
 from .wrappers import BinderBuilder, XDevice, auto_vertex_layout
 
+log = logging.getLogger(__name__)
+
 _assets = os.path.abspath(os.path.join(os.path.dirname(__file__), "assets"))
 
 
+# ortho projection with the size-dependent scales ([0, 0] and [1, 1]) left at zero
+_ORTHO_TEMPLATE = np.array(
+    [
+        [0.0, 0.0, 0.0, -1.0],
+        [0.0, 0.0, 0.0, 1.0],
+        [0.0, 0.0, -1.0, 0.0],
+        [0.0, 0.0, 0.0, 1.0],
+    ],
+    dtype=np.float32,
+)
+
+
 def ortho_proj_imgui(px_width: float, px_height: float) -> NDArray:
-    return np.array(
-        [
-            [2.0 / px_width, 0.0, 0.0, -1.0],
-            [0.0, -2.0 / px_height, 0.0, 1.0],
-            [0.0, 0.0, -1.0, 0.0],
-            [0.0, 0.0, 0.0, 1.0],
-        ],
-        dtype=np.float32,
-    )
+    proj = _ORTHO_TEMPLATE.copy()
+    proj[0, 0] = 2.0 / px_width
+    proj[1, 1] = -2.0 / px_height
+    return proj
+
+
+def _grow_size(need: int, min_size: int = 256 * 1024) -> int:
+    """GPU buffer size to allocate for `need` bytes: next power of two, at least
+    `min_size`, so a slowly growing UI doesn't reallocate every frame"""
+    return max(min_size, 1 << (need - 1).bit_length())
+
+
+def _ensure_stage(stage: Optional[NDArray], size: int) -> NDArray:
+    """Return a byte array of at least `size` bytes, growing `stage` 2x if needed"""
+    if stage is not None and stage.nbytes >= size:
+        return stage
+    cur = 0 if stage is None else stage.nbytes
+    return np.empty(max(size, 2 * cur), dtype=np.uint8)
 
 
 def compute_fb_scale(window_size, frame_buffer_size):
@@ -136,6 +160,53 @@ class ImguiWindow(GLFWWindow):
         self._gui_time = current_time
 
 
+_SHADER_TEMPLATE = """
+struct Uniforms {
+    @align(16) proj_mtx: mat4x4f,
+}
+
+struct VertexInput {
+    @location(0) position: vec2f,
+    @location(1) uv: vec2f,
+    @location(2) color: vec4f,
+}
+
+struct VertexOutput {
+    @builtin(position) position: vec4f,
+    @location(0) uv: vec2f,
+    @location(1) color: vec4f,
+}
+
+@group(0) @binding(0) var<uniform> uniforms: Uniforms;
+@group(0) @binding(1) var tex: texture_2d<f32>;
+@group(0) @binding(2) var samp: sampler;
+
+@vertex
+fn vs_main(input: VertexInput) -> VertexOutput {
+    let pos = uniforms.proj_mtx * vec4f(input.position, 0.0, 1.0);
+    return VertexOutput(pos, input.uv, input.color);
+}
+
+@fragment
+fn fs_main(input: VertexOutput) -> @location(0) vec4f {
+    let texcolor = textureSample(tex, samp, input.uv.xy);
+    let outcolor = input.color * texcolor;
+    return [[RETVAL]];
+}
+"""
+
+# ImGui colors are already in srgb, so if the target is srgb
+# we have to do this dance of converting to linear colors
+# which the target will then convert back to srgb on store
+_WGSL_SRGB = _SHADER_TEMPLATE.replace(
+    "[[RETVAL]]", "vec4f(pow(outcolor.rgb, vec3f(2.2)), outcolor.a)"
+)
+# The target is an undecorated target, which means that
+# the returned color will be stored directly without gamma
+# adjustment
+_WGSL_LINEAR = _SHADER_TEMPLATE.replace("[[RETVAL]]", "outcolor")
+
+
 class XGPUImguiRenderer:
     """xgpu integration class."""
 
@@ -143,52 +214,7 @@ class XGPUImguiRenderer:
         """Return a specialized variant of the shader targeting either
         an srgb or non-srgb render target.
         """
-
-        if is_srgb:
-            # ImGui colors are already in srgb, so if the target is srgb
-            # we have to do this dance of converting to linear colors
-            # which the target will then convert back to srgb on store
-            retval = "vec4f(pow(outcolor.rgb, vec3f(2.2)), outcolor.a)"
-        else:
-            # The target is an undecorated target, which means that
-            # the returned color will be stored directly without gamma
-            # adjustment
-            retval = "outcolor"
-
-        return """
-        struct Uniforms {
-            @align(16) proj_mtx: mat4x4f,
-        }
-
-        struct VertexInput {
-            @location(0) position: vec2f,
-            @location(1) uv: vec2f,
-            @location(2) color: vec4f,
-        }
-
-        struct VertexOutput {
-            @builtin(position) position: vec4f,
-            @location(0) uv: vec2f,
-            @location(1) color: vec4f,
-        }
-
-        @group(0) @binding(0) var<uniform> uniforms: Uniforms;
-        @group(0) @binding(1) var tex: texture_2d<f32>;
-        @group(0) @binding(2) var samp: sampler;
-
-        @vertex
-        fn vs_main(input: VertexInput) -> VertexOutput {
-            let pos = uniforms.proj_mtx * vec4f(input.position, 0.0, 1.0);
-            return VertexOutput(pos, input.uv, input.color);
-        }
-
-        @fragment
-        fn fs_main(input: VertexOutput) -> @location(0) vec4f {
-            let texcolor = textureSample(tex, samp, input.uv.xy);
-            let outcolor = input.color * texcolor;
-            return [[RETVAL]];
-        }
-        """.replace("[[RETVAL]]", retval)
+        return _WGSL_SRGB if is_srgb else _WGSL_LINEAR
 
     def __init__(
         self,
@@ -204,10 +230,29 @@ class XGPUImguiRenderer:
 
         self._next_tex_id = 0
         self._texture_map: dict[int, tuple[xg.Texture, xg.TextureView]] = {}
+        # bindgroups by texture id; the uniform buffer and sampler never change
+        self._bindgroup_cache: dict[int, xg.BindGroup] = {}
+        self._ifmt = (
+            xg.IndexFormat.Uint32 if imgui.INDEX_SIZE == 4 else xg.IndexFormat.Uint16
+        )
 
         self.io = imgui_io
         self.io.delta_time = 1.0 / 60.0
 
+        # only the view changes between frames
+        self._color_attachment = xg.renderPassColorAttachment(
+            view=None,
+            depthSlice=0,
+            loadOp=xg.LoadOp.Load,
+            storeOp=xg.StoreOp.Store,
+            clearValue=xg.Color(),
+        )
+
+        # projection matrix (stored transposed, as the shader expects) and the
+        # display size it was last computed for
+        self._ortho_buf = np.ascontiguousarray(_ORTHO_TEMPLATE.T)
+        self._ortho_key: Optional[Tuple[float, float]] = None
+
         self._create_device_objects()
         self.refresh_font_texture()
 
@@ -225,6 +270,9 @@ class XGPUImguiRenderer:
             arrayLayerCount=1,
         )
         self._texture_map[id] = (tex, view)
+        old_bindgroup = self._bindgroup_cache.pop(id, None)
+        if old_bindgroup is not None:
+            old_bindgroup.release()
 
     def refresh_font_texture(self):
         width, height, pixels = self.io.fonts.get_tex_data_as_rgba32()
@@ -278,11 +326,20 @@ class XGPUImguiRenderer:
         self._bind_sampler = bb.add_sampler(binding=2, visibility=xg.ShaderStage.Fragment)
         self._binder = bb.complete()
 
+    def _create_bindgroup(self, tex_id: int) -> xg.BindGroup:
+        _tex, view = self._texture_map[tex_id]
+        self._bind_uniforms.set(self._ubuff, 0)
+        self._bind_tex.set(view)
+        self._bind_sampler.set(self._sampler)
+        bg = self._binder.create_bindgroup()
+        self._bindgroup_cache[tex_id] = bg
+        return bg
+
     def _create_device_objects(self):
         self._create_bind_layout()
         is_srgb = "srgb" in self._window_tex_format.name.lower()
         shadersrc = self.get_shader_src(is_srgb)
-        self._shader = self._device.createWGSLShaderModule(code=shadersrc)
+        self._shader = self._device.getCachedWGSLShaderModule(code=shadersrc)
 
         self._pipeline_layout = self._device.createPipelineLayout(
             bindGroupLayouts=[self._binder.layout]
@@ -300,6 +357,8 @@ class XGPUImguiRenderer:
 
         self._vbuff: xg.Buffer | None = None
         self._ibuff: xg.Buffer | None = None
+        self._vstage: NDArray | None = None
+        self._istage: NDArray | None = None
 
         REPLACE = xg.blendComponent(
             srcFactor=xg.BlendFactor.One,
@@ -358,52 +417,67 @@ class XGPUImguiRenderer:
         idx_count = sum(cmd.idx_buffer_size for cmd in command_lists)
         vtx_count = sum(cmd.vtx_buffer_size for cmd in command_lists)
 
-        idx_size = idx_count * imgui.INDEX_SIZE
-        vtx_size = vtx_count * imgui.VERTEX_SIZE
+        # writeBuffer sizes must be multiples of 4 bytes
+        idx_size = (idx_count * imgui.INDEX_SIZE + 3) & ~3
+        vtx_size = (vtx_count * imgui.VERTEX_SIZE + 3) & ~3
 
+        # buffers grow geometrically and never shrink
         if self._vbuff is None or self._vbuff.getSize() < vtx_size:
-            print(f"Resizing vbuff -> {vtx_size}")
+            size = _grow_size(vtx_size)
+            log.debug("Resizing vbuff -> %d", size)
             self._vbuff = self._device.createBuffer(
                 label="vertexbuffer",
                 usage=xg.BufferUsage.Vertex | xg.BufferUsage.CopyDst,
-                size=max(1024, vtx_size),
+                size=size,
             )
 
         if self._ibuff is None or self._ibuff.getSize() < idx_size:
-            print(f"Resizing ibuff -> {idx_size}")
+            size = _grow_size(idx_size)
+            log.debug("Resizing ibuff -> %d", size)
             self._ibuff = self._device.createBuffer(
                 label="indexbuffer",
                 usage=xg.BufferUsage.Index | xg.BufferUsage.CopyDst,
-                size=max(1024, idx_size),
+                size=size,
             )
 
+        # gather all lists into CPU staging arrays, then upload each in one go
+        self._vstage = _ensure_stage(self._vstage, vtx_size)
+        self._istage = _ensure_stage(self._istage, idx_size)
+        vdst = xg.ffi.from_buffer(self._vstage)
+        idst = xg.ffi.from_buffer(self._istage)
+
         offsets: list[tuple[int, int]] = []
         ipos = 0
         vpos = 0
         for cmd in command_lists:
             nvrt = cmd.vtx_buffer_size
             nidx = cmd.idx_buffer_size
-            vptr = xg.DataPtr(
-                xg.ffi.cast("void *", cmd.vtx_buffer_data), nvrt * imgui.VERTEX_SIZE
+            xg.ffi.memmove(
+                vdst + vpos * imgui.VERTEX_SIZE,
+                xg.ffi.cast("void *", cmd.vtx_buffer_data),
+                nvrt * imgui.VERTEX_SIZE,
             )
-            iptr = xg.DataPtr(
-                xg.ffi.cast("void *", cmd.idx_buffer_data), nidx * imgui.INDEX_SIZE
+            xg.ffi.memmove(
+                idst + ipos * imgui.INDEX_SIZE,
+                xg.ffi.cast("void *", cmd.idx_buffer_data),
+                nidx * imgui.INDEX_SIZE,
             )
-            self._device.queue.writeBuffer(
-                self._vbuff,
-                vpos * imgui.VERTEX_SIZE,
-                vptr,
-            )
-            self._device.queue.writeBuffer(self._ibuff, ipos * imgui.INDEX_SIZE, iptr)
             offsets.append((ipos, vpos))
             ipos += nidx
             vpos += nvrt
 
+        if vtx_size > 0:
+            self._device.queue.writeBuffer(self._vbuff, 0, xg.DataPtr(vdst, vtx_size))
+        if idx_size > 0:
+            self._device.queue.writeBuffer(self._ibuff, 0, xg.DataPtr(idst, idx_size))
+
         return self._ibuff, self._vbuff, offsets
 
     def render(self, draw_data, color_view: xg.TextureView):
         # perf: local for faster access
         io = self.io
+        bindgroup_cache = self._bindgroup_cache
+        create_bindgroup = self._create_bindgroup
 
         display_width, display_height = io.display_size
         fb_width = int(display_width * io.display_fb_scale[0])
@@ -414,53 +488,61 @@ class XGPUImguiRenderer:
 
         draw_data.scale_clip_rects(*io.display_fb_scale)
 
-        ortho_projection = np.ascontiguousarray(
-            ortho_proj_imgui(display_width, display_height).T
-        )
-        self._device.queue.writeBuffer(self._ubuff, 0, xg.DataPtr.wrap(ortho_projection))
+        if self._ortho_key != (display_width, display_height):
+            # transpose of ortho_proj_imgui(display_width, display_height)
+            proj = self._ortho_buf
+            proj[0, 0] = 2.0 / display_width
+            proj[1, 1] = -2.0 / display_height
+            self._device.queue.writeBuffer(self._ubuff, 0, xg.DataPtr.wrap(proj))
+            self._ortho_key = (display_width, display_height)
         ibuff, vbuff, buffer_offsets = self._upload_geometry(draw_data.commands_lists)
 
         encoder = self._device.createCommandEncoder()
 
-        color_attachment = xg.renderPassColorAttachment(
-            view=color_view,
-            depthSlice=0,
-            loadOp=xg.LoadOp.Load,
-            storeOp=xg.StoreOp.Store,
-            clearValue=xg.Color(),
-        )
-
+        color_attachment = self._color_attachment
+        color_attachment.view = color_view
         renderpass = encoder.beginRenderPass(colorAttachments=[color_attachment])
         renderpass.setPipeline(self._pipeline)
         renderpass.setVertexBuffer(0, vbuff, 0, vbuff.getSize())
-        ifmt = xg.IndexFormat.Uint16
-        if imgui.INDEX_SIZE == 4:
-            ifmt = xg.IndexFormat.Uint32
-        renderpass.setIndexBuffer(ibuff, ifmt, 0, ibuff.getSize())
+        renderpass.setIndexBuffer(ibuff, self._ifmt, 0, ibuff.getSize())
 
-        bgs = []
         for commands, offsets in zip(draw_data.commands_lists, buffer_offsets):
             idx_buffer_offset = offsets[0]
             vtx_buffer_offset = offsets[1]
 
+            # runs of consecutive commands sharing a texture and clip rect are
+            # drawn with a single drawIndexed
             last_tex_id = None
+            run_clip = None
+            run_start = idx_buffer_offset
             for command in commands.commands:
-                if command.texture_id != last_tex_id:
-                    _tex, view = self._texture_map[command.texture_id]
-                    self._bind_uniforms.set(self._ubuff, 0)
-                    self._bind_tex.set(view)
-                    self._bind_sampler.set(self._sampler)
-                    bg = self._binder.create_bindgroup()
-                    bgs.append(bg)
-                    renderpass.setBindGroup(0, bg, dynamicOffsets=[])
-                    last_tex_id = command.texture_id
-
                 x, y, x1, y1 = command.clip_rect
-                renderpass.setScissorRect(int(x), int(y), int(x1 - x), int(y1 - y))
+                clip = (int(x), int(y), int(x1 - x), int(y1 - y))
+                tex_id = command.texture_id
+                if tex_id != last_tex_id or clip != run_clip:
+                    if idx_buffer_offset > run_start:
+                        renderpass.drawIndexed(
+                            idx_buffer_offset - run_start,
+                            1,
+                            run_start,
+                            vtx_buffer_offset,
+                            0,
+                        )
+                    run_start = idx_buffer_offset
+                    if tex_id != last_tex_id:
+                        bg = bindgroup_cache.get(tex_id)
+                        if bg is None:
+                            bg = create_bindgroup(tex_id)
+                        renderpass.setBindGroup(0, bg, dynamicOffsets=[])
+                        last_tex_id = tex_id
+                    if clip != run_clip:
+                        renderpass.setScissorRect(*clip)
+                        run_clip = clip
+                idx_buffer_offset += command.elem_count
+            if idx_buffer_offset > run_start:
                 renderpass.drawIndexed(
-                    command.elem_count, 1, idx_buffer_offset, vtx_buffer_offset, 0
+                    idx_buffer_offset - run_start, 1, run_start, vtx_buffer_offset, 0
                 )
-                idx_buffer_offset += command.elem_count
 
         renderpass.end()
         self._device.queue.submit([encoder.finish()])
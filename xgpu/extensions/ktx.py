@@ -1,7 +1,6 @@
-import math
 import struct
 from enum import IntEnum
-from typing import List, Tuple
+from typing import List, Tuple, Union
 
 from .. import bindings as xg
 from ..textureformats import format_layout_info
@@ -29,10 +28,12 @@ from .vkformats import VK_FORMAT_TO_XG
 # UInt64 sgdByteLength
 
 HEADER_FORMAT = "<12s" + ("I" * 9) + ("I" * 4) + ("Q" * 2)
-HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+_HEADER = struct.Struct(HEADER_FORMAT)
+HEADER_SIZE = _HEADER.size
 
 LEVEL_INDEX_FORMAT = "<QQQ"
-LEVEL_INDEX_FORMAT_SIZE = struct.calcsize(LEVEL_INDEX_FORMAT)
+_LEVEL = struct.Struct(LEVEL_INDEX_FORMAT)
+LEVEL_INDEX_FORMAT_SIZE = _LEVEL.size
 
 
 class KTXCompression(IntEnum):
@@ -43,17 +44,18 @@ class KTXCompression(IntEnum):
 
 
 def mip_pixel_size(mip0_size: int, mip: int) -> int:
-    return math.floor(mip0_size / (2**mip))
+    return mip0_size >> mip
 
 
 def block_count(pixel_size: int, mip: int, block_size: int) -> int:
-    return max(1, math.ceil(mip_pixel_size(pixel_size, mip) / block_size))
+    return max(1, (mip_pixel_size(pixel_size, mip) + block_size - 1) // block_size)
 
 
 class KTXTextureData(TextureData):
     def __init__(self, data: bytes):
         self.data = data
-        fields = struct.unpack(HEADER_FORMAT, data[0:HEADER_SIZE])
+        self._mv = memoryview(data)
+        fields = _HEADER.unpack_from(data, 0)
         self.ident: bytes = fields[0]
         if self.ident != bytes(
             [0xAB, 0x4B, 0x54, 0x58, 0x20, 0x32, 0x30, 0xBB, 0x0D, 0x0A, 0x1A, 0x0A]
@@ -86,20 +88,15 @@ class KTXTextureData(TextureData):
         self.kvd_length: int = fields[13]
         self.sgd_offset: int = fields[14]
         self.sgd_length: int = fields[15]
-        level_index: List[Tuple[int, int, int]] = []
-        for idx in range(self._level_count):
-            startpos = HEADER_SIZE + idx * LEVEL_INDEX_FORMAT_SIZE
-            endpos = startpos + LEVEL_INDEX_FORMAT_SIZE
-            (offset, length, ulength) = struct.unpack(
-                LEVEL_INDEX_FORMAT, data[startpos:endpos]
-            )
-            level_index.append((offset, length, ulength))
-        self.level_index: List[Tuple[int, int, int]] = level_index
+        index_end = HEADER_SIZE + self._level_count * LEVEL_INDEX_FORMAT_SIZE
+        self.level_index: List[Tuple[int, int, int]] = list(
+            _LEVEL.iter_unpack(self._mv[HEADER_SIZE:index_end])
+        )
 
     def pixel_extent(self, mip: int) -> Tuple[int, int, int]:
         sx = mip_pixel_size(self.width, mip)
         sy = mip_pixel_size(self.height, mip)
-        sz = mip_pixel_size(self.width, mip)
+        sz = mip_pixel_size(self.depth, mip)
         return sx, sy, sz
 
     def block_extent(self, mip: int) -> Tuple[int, int, int, int, int, int]:
@@ -161,16 +158,16 @@ class KTXTextureData(TextureData):
         else:
             raise ValueError("Not a valid WebGPU texture shape!")
 
-    def _decompress(self, data: bytes) -> bytes:
+    def _decompress(self, data: memoryview) -> Union[bytes, memoryview]:
         if self.compress == KTXCompression.Uncompressed:
             return data
         raise NotImplementedError()
 
-    def get_level_data(self, mip: int) -> bytes:
+    def get_level_data(self, mip: int) -> Union[bytes, memoryview]:
         if not (mip >= 0 and mip < len(self.level_index)):
             raise ValueError(f"index OoB: {mip}/{len(self.level_index)}")
         (offset, length, uncompressed_length) = self.level_index[mip]
-        return self._decompress(self.data[offset : offset + length])
+        return self._decompress(self._mv[offset : offset + length])
 
     def get_level_info(self, mip: int) -> Tuple[xg.TextureDataLayout, xg.Extent3D]:
         bx, by, _bz, px, py, pz = self.block_extent(mip)
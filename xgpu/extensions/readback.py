@@ -0,0 +1,214 @@
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional, TypeVar
+
+from .. import bindings as xg
+from .wrappers import (
+    _CAN_POLL,
+    COPY_BYTES_PER_ROW_ALIGNMENT,
+    XDevice,
+    round_up_to,
+    unpad_rows,
+)
+
+T = TypeVar("T")
+
+
+class TexReadbackRing:
+    """Pipelined texture readback through a ring of MapRead staging buffers:
+    `submit` copies a texture into the next free buffer (mapping it
+    asynchronously once the copy has been submitted), and `read` hands out
+    the oldest submitted result once it is available, so the CPU doesn't
+    have to stall on the GPU for every readback.
+
+    Rows in the read data are padded to `bytes_per_row`.
+    """
+
+    def __init__(
+        self,
+        device: XDevice,
+        width: int,
+        height: int,
+        bytes_per_pixel: int = 4,
+        count: int = 2,
+    ):
+        self.device = device
+        self.width = width
+        self.height = height
+        self.bytes_per_pixel = bytes_per_pixel
+        self.bytes_per_row = round_up_to(
+            width * bytes_per_pixel, COPY_BYTES_PER_ROW_ALIGNMENT
+        )
+        self.size = self.bytes_per_row * height
+        self.buffers = [
+            device.createBuffer(
+                usage=xg.BufferUsage.CopyDst | xg.BufferUsage.MapRead,
+                size=self.size,
+                mappedAtCreation=False,
+            )
+            for _ in range(count)
+        ]
+        self.mapped = [False] * count
+        # per-buffer map result, None while the mapping is still pending
+        self._status: List[Optional[xg.BufferMapAsyncStatus]] = [None] * count
+        self._map_requested = [False] * count
+        self._map_cbs = [
+            xg.BufferMapAsyncCallback(self._make_map_cb(idx)) for idx in range(count)
+        ]
+        self._free: List[int] = list(range(count))
+        self._pending: Deque[int] = deque()
+        self._layout = xg.textureDataLayout(
+            offset=0, bytesPerRow=self.bytes_per_row, rowsPerImage=height
+        )
+        self._extent = xg.extent3D(width=width, height=height, depthOrArrayLayers=1)
+        self._src = xg.ImageCopyTexture()
+        self._src.mipLevel = 0
+        self._src.origin = xg.origin3D(x=0, y=0, z=0)
+        self._src.aspect = xg.TextureAspect.All
+        self._dsts = [
+            xg.imageCopyBuffer(layout=self._layout, buffer=buf) for buf in self.buffers
+        ]
+
+    def _make_map_cb(self, idx: int) -> Callable[[xg.BufferMapAsyncStatus], None]:
+        def _on_mapped(status: xg.BufferMapAsyncStatus) -> None:
+            # an exception raised here would be swallowed by cffi, so failures
+            # are recorded and raised from read()
+            self._status[idx] = status
+            self.mapped[idx] = status == xg.BufferMapAsyncStatus.Success
+
+        return _on_mapped
+
+    def submit(self, tex: xg.Texture, encoder: Optional[xg.CommandEncoder] = None) -> None:
+        """Copy `tex` into the next free staging buffer; if `encoder` is given
+        the copy is recorded into it (and the caller must submit it before the
+        next `read`), otherwise it is submitted immediately.
+        """
+        if len(self._free) == 0:
+            raise RuntimeError("Readback ring is full: read() results first")
+        idx = self._free.pop()
+        own_encoder = encoder is None
+        if encoder is None:
+            encoder = self.device.createCommandEncoder()
+        self._src.texture = tex
+        encoder.copyTextureToBuffer(
+            source=self._src, destination=self._dsts[idx], copySize=self._extent
+        )
+        self._pending.append(idx)
+        if own_encoder:
+            self.device.queue.submit([encoder.finish()])
+            self._request_map(idx)
+
+    def _request_map(self, idx: int) -> None:
+        if not self._map_requested[idx]:
+            self.buffers[idx].mapAsync(
+                xg.MapMode.Read, 0, self.size, self._map_cbs[idx]
+            )
+            self._map_requested[idx] = True
+
+    def read(self, consumer: Callable[[memoryview], T], wait: bool = False) -> Optional[T]:
+        """Pass the oldest pending readback to `consumer` if it is ready
+        (or always, if `wait`), returning its result; returns None if nothing
+        is ready. The view is only valid until `consumer` returns.
+
+        Under emscripten the device can't be polled, so `wait` raises a
+        RuntimeError if the readback isn't ready yet.
+        """
+        if len(self._pending) == 0:
+            return None
+        idx = self._pending[0]
+        buffer = self.buffers[idx]
+        if self._status[idx] is None:
+            self._request_map(idx)
+            if not _CAN_POLL:
+                # the map callback can only fire once control returns to the
+                # browser event loop, so waiting here would never finish
+                if wait:
+                    raise RuntimeError("Cannot wait for a readback without polling")
+                return None
+            self.device.poll(wait=False, wrappedSubmissionIndex=None)
+            # non-blocking polls rather than poll(wait=True), which waits for
+            # the whole queue to drain rather than just this mapping
+            while wait and self._status[idx] is None:
+                time.sleep(0.0005)
+                self.device.poll(wait=False, wrappedSubmissionIndex=None)
+            if self._status[idx] is None:
+                return None
+        self._pending.popleft()
+        status = self._status[idx]
+        if status != xg.BufferMapAsyncStatus.Success:
+            self._recycle(idx)
+            raise RuntimeError(f"Mapping error! {status}")
+        view = memoryview(buffer.getMappedRange(0, self.size).buffer_view())
+        try:
+            return consumer(view)
+        finally:
+            view.release()
+            buffer.unmap()
+            self._recycle(idx)
+
+    def _recycle(self, idx: int) -> None:
+        """Return a (no longer mapped) buffer to the free list"""
+        self.mapped[idx] = False
+        self._status[idx] = None
+        self._map_requested[idx] = False
+        self._free.append(idx)
+
+    @property
+    def pending_count(self) -> int:
+        """Number of submitted readbacks that haven't been read yet"""
+        return len(self._pending)
+
+    def unpad(self, view: memoryview) -> bytes:
+        """Copy row-padded read data into tightly packed bytes"""
+        row_bytes = self.width * self.bytes_per_pixel
+        return unpad_rows(view, row_bytes, self.bytes_per_row, self.height)
+
+
+class PipelinedTextureReadback:
+    """Texture readback with `frames - 1` frames of latency: each `submit(tex)`
+    returns the (tightly packed) pixel data of the texture submitted
+    `frames - 1` calls earlier, or None while the pipeline is filling up.
+    With frames=1 this is an ordinary synchronous readback.
+    """
+
+    def __init__(
+        self,
+        device: XDevice,
+        width: int,
+        height: int,
+        bytes_per_pixel: int = 4,
+        frames: int = 2,
+    ):
+        self.frames = frames
+        self.ring = TexReadbackRing(device, width, height, bytes_per_pixel, frames)
+
+    def submit(self, tex: xg.Texture) -> Optional[bytes]:
+        self.ring.submit(tex)
+        if self.ring.pending_count < self.frames:
+            return None
+        return self.ring.read(self.ring.unpad, wait=True)
+
+    def flush(self) -> List[bytes]:
+        """Wait for and return all still-pending readbacks, oldest first"""
+        results = []
+        while self.ring.pending_count > 0:
+            res = self.ring.read(self.ring.unpad, wait=True)
+            assert res is not None
+            results.append(res)
+        return results
+
+
+class FixedSizeRGBAReadback:
+    """Synchronous readback of same-sized RGBA textures (e.g., a render target),
+    reusing one staging buffer and set of copy descriptors for every read
+    """
+
+    def __init__(self, device: XDevice, width: int, height: int):
+        self.ring = TexReadbackRing(device, width, height, bytes_per_pixel=4, count=1)
+
+    def read(self, tex: xg.Texture) -> bytes:
+        """Read `tex` (which must be width x height) back as packed RGBA bytes"""
+        self.ring.submit(tex)
+        res = self.ring.read(self.ring.unpad, wait=True)
+        assert res is not None
+        return res
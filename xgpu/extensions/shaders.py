@@ -0,0 +1,127 @@
+import hashlib
+import logging
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+from typing import Dict, Optional, Tuple, Union
+
+from .. import bindings as xg
+from .wrappers import XDevice
+
+log = logging.getLogger(__name__)
+
+SPIRV_MAGIC = 0x07230203
+# magic, version, generator, bound, schema
+SPIRV_HEADER_SIZE = 20
+
+# shader modules created through precompiled_shader, keyed on (device, source);
+# the device is kept alongside the module so that its id can't be reused
+_module_cache: Dict[Tuple[int, Union[str, bytes]], Tuple[XDevice, xg.ShaderModule]] = {}
+
+
+def precompiled_shader(
+    device: XDevice,
+    spirv: Union[str, "os.PathLike[str]", bytes],
+    wgsl_fallback: Optional[str] = None,
+    label: Optional[str] = None,
+) -> xg.ShaderModule:
+    """
+    Create a shader module from precompiled SPIR-V (either the binary itself
+    or a path to a .spv file, e.g. produced by `naga shader.wgsl shader.spv`),
+    skipping WGSL parsing at startup. If the .spv file does not exist, falls
+    back to compiling `wgsl_fallback` if given.
+    Modules are cached per device, so repeated calls are cheap.
+    """
+    key = (id(device), spirv if isinstance(spirv, bytes) else os.fspath(spirv))
+    entry = _module_cache.get(key)
+    if entry is not None:
+        return entry[1]
+
+    if isinstance(spirv, bytes):
+        module = device.createSPIRVShaderModule(spirv, label=label)
+    elif os.path.exists(spirv):
+        with open(spirv, "rb") as src:
+            module = device.createSPIRVShaderModule(src.read(), label=label)
+    elif wgsl_fallback is not None:
+        module = device.createWGSLShaderModule(code=wgsl_fallback, label=label)
+    else:
+        raise FileNotFoundError(f"No SPIR-V shader at {spirv}")
+
+    _module_cache[key] = (device, module)
+    return module
+
+
+def _default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "xgpu")
+
+
+def _compile_spirv(wgsl: str, dest: str) -> None:
+    """Compile WGSL to SPIR-V at `dest` with the naga CLI (if installed)"""
+    naga = shutil.which("naga")
+    if naga is None:
+        return
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(dest)) as tmpdir:
+        src_fn = os.path.join(tmpdir, "shader.wgsl")
+        spv_fn = os.path.join(tmpdir, "shader.spv")
+        with open(src_fn, "w") as src:
+            src.write(wgsl)
+        res = subprocess.run([naga, src_fn, spv_fn], capture_output=True)
+        if res.returncode == 0 and os.path.exists(spv_fn):
+            # atomic, so concurrent processes never see a partial file
+            os.replace(spv_fn, dest)
+
+
+def _is_valid_spirv(fn: str) -> bool:
+    """Whether `fn` looks like a complete SPIR-V binary (header and magic)"""
+    with open(fn, "rb") as src:
+        data = src.read()
+    if len(data) < SPIRV_HEADER_SIZE or len(data) % 4 != 0:
+        return False
+    (magic,) = struct.unpack_from("<I", data)
+    return magic == SPIRV_MAGIC
+
+
+def cached_shader(
+    device: XDevice,
+    wgsl: str,
+    label: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+) -> xg.ShaderModule:
+    """
+    Create a shader module from WGSL source, using an on-disk cache of
+    SPIR-V (by default in ~/.cache/xgpu) keyed by the hash of the source.
+    On a cache miss the WGSL is compiled directly, and if the `naga` CLI is
+    available the SPIR-V is also generated and stored for next time.
+    Corrupt or truncated cache files are deleted and regenerated.
+    """
+    if cache_dir is None:
+        cache_dir = _default_cache_dir()
+    digest = hashlib.blake2b(wgsl.encode(), digest_size=16).hexdigest()
+    spv_fn = os.path.join(cache_dir, f"{digest}.spv")
+    is_cached = os.path.exists(spv_fn)
+    if is_cached:
+        try:
+            is_cached = _is_valid_spirv(spv_fn)
+        except OSError:
+            is_cached = False
+        if not is_cached:
+            log.warning("Discarding invalid cached shader %s", spv_fn)
+            try:
+                os.remove(spv_fn)
+            except OSError as e:
+                # the bad file is still there, so don't try to load it
+                log.warning("Failed to remove %s: %s", spv_fn, e)
+                return device.createWGSLShaderModule(code=wgsl, label=label)
+    module = precompiled_shader(device, spv_fn, wgsl, label=label)
+    if not is_cached:
+        try:
+            _compile_spirv(wgsl, spv_fn)
+        except OSError as e:
+            log.warning("Failed to cache shader %s: %s", label or digest, e)
+    return module
@@ -23,11 +23,20 @@ class TextureData:
     def dimension(self) -> xg.TextureDimension: ...
 
     @abstractmethod
-    def get_level_data(self, mip: int) -> bytes: ...
+    def get_level_data(self, mip: int) -> Union[bytes, memoryview]: ...
 
     @abstractmethod
     def get_level_info(self, mip: int) -> Tuple[xg.TextureDataLayout, xg.Extent3D]: ...
 
+    @property
+    def max_mip_count(self) -> int:
+        """Length of a full mip chain (down to 1x1) for this texture's size"""
+        extent = self.extent3D
+        largest = max(extent.width, extent.height)
+        if self.dimension == xg.TextureDimension._3D:
+            largest = max(largest, extent.depthOrArrayLayers)
+        return max(1, largest.bit_length())
+
     def create_texture(
         self,
         device: XDevice,
@@ -38,7 +47,7 @@ class TextureData:
         flags = usage | xg.TextureUsage.CopyDst  # must have copy dest
         if mip_count is None:
             mip_count = self.level_count
-        mip_count = max(1, min(mip_count, self.level_count))
+        mip_count = max(1, min(mip_count, self.level_count, self.max_mip_count))
         tex = device.createTexture(
             label=label,
             usage=flags,
@@ -49,16 +58,17 @@ class TextureData:
             sampleCount=1,
             viewFormats=[self.format],
         )
-        q = device.getQueue()
+        q = device.queue
+        texdest = xg.imageCopyTexture(
+            texture=tex,
+            mipLevel=0,
+            origin=xg.origin3D(x=0, y=0, z=0),
+            aspect=xg.TextureAspect.All,
+        )
         for mip_idx in range(mip_count):
             mip_data = self.get_level_data(mip_idx)
             mip_layout, mip_extent = self.get_level_info(mip_idx)
-            texdest = xg.imageCopyTexture(
-                texture=tex,
-                mipLevel=mip_idx,
-                origin=xg.origin3D(x=0, y=0, z=0),
-                aspect=xg.TextureAspect.All,
-            )
+            texdest.mipLevel = mip_idx
             q.writeTexture(
                 destination=texdest,
                 data=xg.DataPtr.wrap(mip_data),
@@ -1,7 +1,28 @@
-from typing import Dict, Iterable, List, Optional, Union
+import functools
+import sys
+import threading
+from abc import ABC, abstractmethod
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
 from .. import bindings as xg
 
+T = TypeVar("T")
+
+# Under emscripten the browser event loop drives callbacks and polling the
+# device is unsupported, so waits must not poll
+_CAN_POLL = sys.platform != "emscripten"
+
 
 def _mapped_cb(status: xg.BufferMapAsyncStatus) -> None:
     if status != xg.BufferMapAsyncStatus.Success:
@@ -18,18 +39,83 @@ def round_up_to(v: int, align: int) -> int:
     return v
 
 
+# createBufferWithData uploads up to this size through queue.writeBuffer
+SMALL_UPLOAD_THRESHOLD = 65536
+
+# max number of idle staging buffers XDevice keeps around per size
+STAGING_POOL_CAP = 4
+
+# max number of bindgroups kept by Binder.create_bindgroup_cached
+BINDGROUP_CACHE_LIMIT = 64
+
+# copyTextureToBuffer requires bytesPerRow to be a multiple of this
+COPY_BYTES_PER_ROW_ALIGNMENT = 256
+
+
+def unpad_rows(view: memoryview, row_bytes: int, stride: int, rows: int) -> bytes:
+    """Pack `rows` rows of `row_bytes` bytes, spaced `stride` bytes apart"""
+    if row_bytes == stride:
+        return bytes(view[: row_bytes * rows])
+    return b"".join(view[r * stride : r * stride + row_bytes] for r in range(rows))
+
+
+def _copy_into(out: Any, size: int) -> Callable[[memoryview], Any]:
+    """Make a readback consumer that copies `size` bytes into `out`"""
+    dest = xg.ffi.from_buffer(out, require_writable=True)
+    if len(dest) < size:
+        raise ValueError(f"Output too small: {len(dest)} < {size} bytes")
+
+    def _copy(view: memoryview) -> Any:
+        xg.ffi.memmove(dest, view, size)
+        return out
+
+    return _copy
+
+
+def _query_limits(
+    getter: Callable[[xg.SupportedLimits], bool], limits: xg.SupportedLimits
+) -> bool:
+    """Query limits into `limits` in place; returns whether they changed"""
+    before = bytes(xg.ffi.buffer(limits._cdata))
+    if not getter(limits):
+        raise RuntimeError("Failed to get limits.")
+    return bytes(xg.ffi.buffer(limits._cdata)) != before
+
+
 class XAdapter(xg.Adapter):
-    def __init__(self, inner: xg.Adapter):
-        """Wrap an Adapter into an XAdapter; invalidates the Adapter object"""
+    def __init__(self, inner: xg.Adapter, instance: Optional[xg.Instance] = None):
+        """Wrap an Adapter into an XAdapter; invalidates the Adapter object.
+        `instance` (the one the adapter came from) is ticked while waiting
+        on device requests."""
         self._cdata = inner._cdata
         inner.invalidate()
+        self.instance = instance
         self.info = xg.AdapterInfo()
         self.limits = xg.SupportedLimits()
+        self.limits_version = 0
+        self._features: Optional[List[xg.FeatureName]] = None
+        self._required_limits: Optional[xg.RequiredLimits] = None
+
+    def getFeatures2(self) -> List[xg.FeatureName]:
+        """All supported features (queried once, then cached)"""
+        if self._features is None:
+            self._features = self.enumerateFeatures()
+        return self._features
+
+    def getRequiredLimits2(self) -> xg.RequiredLimits:
+        """RequiredLimits asking for everything the adapter supports (queried
+        once, then cached)"""
+        if self._required_limits is None:
+            self._required_limits = xg.requiredLimits(limits=self.getLimits2())
+        return self._required_limits
 
     def getLimits2(self) -> xg.Limits:
-        happy = self.getLimits(self.limits)
-        if not happy:
-            raise RuntimeError("Failed to get limits.")
+        """Query limits into `self.limits` (the same object is returned every
+        time); `limits_version` is bumped whenever the queried limits differ
+        from the previous ones, so callers can tell when results derived from
+        the limits need refreshing"""
+        if _query_limits(self.getLimits, self.limits):
+            self.limits_version += 1
         return self.limits.limits
 
     def getInfo2(self) -> xg.AdapterInfo:
@@ -46,10 +132,87 @@ class XDevice(xg.Device):
             # TODO: wgpu-native 0.19.1.1
             # Copy limits and queue from parent to avoid ref counting issue
             self.limits = inner.limits
+            self.limits_version = inner.limits_version
             self.queue = inner.queue
         else:
             self.limits = xg.SupportedLimits()
+            self.limits_version = 0
             self.queue = super().getQueue()
+        # MapRead staging buffers for readbacks, by (power of two) size
+        self._stage_pool: Dict[int, List[xg.Buffer]] = {}
+        # reusable map callbacks for BufferReadFutures
+        self._map_slots: List[_MapSlot] = []
+        self._shader_cache: Dict[Tuple[str, Optional[str]], xg.ShaderModule] = {}
+        # texture->buffer copy descriptors reused (mutated in place) by readbacks
+        self._copy_src = xg.ImageCopyTexture()
+        self._copy_src.mipLevel = 0
+        self._copy_src.origin = xg.origin3D(x=0, y=0, z=0)
+        self._copy_src.aspect = xg.TextureAspect.All
+        self._copy_dst = xg.ImageCopyBuffer()
+        self._copy_layout = xg.textureDataLayout(offset=0, bytesPerRow=0, rowsPerImage=0)
+        self._copy_extent = xg.extent3D(width=0, height=0, depthOrArrayLayers=1)
+
+    def _acquire_staging(self, size: int) -> xg.Buffer:
+        """Get a CopyDst|MapRead buffer of at least `size` bytes"""
+        bucket = 1 << max(size - 1, 255).bit_length()
+        pool = self._stage_pool.get(bucket)
+        if pool:
+            return pool.pop()
+        return self.createBuffer(
+            usage=xg.BufferUsage.CopyDst | xg.BufferUsage.MapRead,
+            size=bucket,
+            mappedAtCreation=False,
+        )
+
+    def _release_staging(self, buffer: xg.Buffer) -> None:
+        """Return an (unmapped) staging buffer to the pool"""
+        pool = self._stage_pool.setdefault(buffer.getSize(), [])
+        if len(pool) < STAGING_POOL_CAP:
+            pool.append(buffer)
+        else:
+            buffer.destroy()
+
+    def _read_staging(
+        self, buffer: xg.Buffer, size: int, consumer: Callable[[memoryview], T]
+    ) -> T:
+        """Read a staging buffer (see readBufferWith) and return it to the pool;
+        if the read fails, possibly leaving a mapping pending, the buffer is
+        destroyed instead"""
+        try:
+            result = self.readBufferWith(buffer, 0, size, consumer)
+        except BaseException:
+            buffer.destroy()
+            raise
+        self._release_staging(buffer)
+        return result
+
+    def _copy_texture_to_buffer(
+        self,
+        encoder: xg.CommandEncoder,
+        tex: xg.Texture,
+        buffer: xg.Buffer,
+        layout: xg.TextureDataLayout,
+        depth: int = 1,
+    ) -> None:
+        """Record a full copy of mip 0 of `tex` into `buffer`"""
+        self._copy_src.texture = tex
+        self._copy_dst.layout = layout
+        self._copy_dst.buffer = buffer
+        self._copy_extent.width = tex.getWidth()
+        self._copy_extent.height = tex.getHeight()
+        self._copy_extent.depthOrArrayLayers = depth
+        encoder.copyTextureToBuffer(
+            source=self._copy_src, destination=self._copy_dst, copySize=self._copy_extent
+        )
+
+    def _acquire_map_slot(self, future: "BufferReadFuture") -> "_MapSlot":
+        slot = self._map_slots.pop() if self._map_slots else _MapSlot()
+        slot.future = future
+        return slot
+
+    def _release_map_slot(self, slot: "_MapSlot") -> None:
+        slot.future = None
+        self._map_slots.append(slot)
 
     def getQueue(self) -> xg.Queue:
         # TODO: wgpu-native 0.19.1.1
@@ -59,37 +222,128 @@ class XDevice(xg.Device):
     def createWGSLShaderModule(
         self, code: str, label: Optional[str] = None
     ) -> xg.ShaderModule:
+        """Create a shader module from WGSL source"""
         return self.createShaderModule(
             nextInChain=xg.ChainedStruct([xg.shaderModuleWGSLDescriptor(code=code)]),
             label=label,
             hints=[],
         )
 
+    def getCachedWGSLShaderModule(
+        self, code: str, label: Optional[str] = None
+    ) -> xg.ShaderModule:
+        """Like createWGSLShaderModule, but compiling the same source (and
+        label) again returns the same module. Cached modules are shared, so
+        they must not be released by the caller."""
+        key = (code, label)
+        module = self._shader_cache.get(key)
+        if module is None or module._cdata == xg.ffi.NULL:
+            module = self.createWGSLShaderModule(code, label)
+            self._shader_cache[key] = module
+        return module
+
+    def createSPIRVShaderModule(
+        self, code: bytes, label: Optional[str] = None
+    ) -> xg.ShaderModule:
+        """Create a shader module from a SPIR-V binary"""
+        words = xg.ffi.from_buffer("uint32_t[]", code)
+        return self.createShaderModule(
+            nextInChain=xg.ChainedStruct(
+                [xg.shaderModuleSPIRVDescriptor(codeSize=len(words), code=words)]
+            ),
+            label=label,
+            hints=[],
+        )
+
     def createBufferWithData(
-        self, data: bytes, usage: Union[xg.BufferUsage, xg.BufferUsageFlags, int]
+        self,
+        data: Union[bytes, memoryview, xg.DataPtr, Any],
+        usage: Union[xg.BufferUsage, xg.BufferUsageFlags, int],
     ) -> xg.Buffer:
-        bsize = len(data)
+        """Create a buffer initialized with `data`, which can be a DataPtr or
+        any contiguous buffer-protocol object (bytes, memoryview, ndarray, ...);
+        the data is copied straight from its memory into the mapped buffer.
+        This allocates a new buffer: for repeated updates of an existing
+        buffer use writeBufferData instead."""
+        if isinstance(data, xg.DataPtr):
+            bsize = data._size
+            src = data._ptr
+        else:
+            src = xg.ffi.from_buffer(data)
+            bsize = len(src)
+        if (
+            bsize <= SMALL_UPLOAD_THRESHOLD
+            and bsize % 4 == 0
+            and int(usage) & int(xg.BufferUsage.CopyDst)
+        ):
+            # small uploads: let the queue stage the data, skipping map/unmap
+            buffer = self.createBuffer(usage=usage, size=bsize, mappedAtCreation=False)
+            self.queue.writeBuffer(buffer, 0, xg.DataPtr(src, bsize))
+            return buffer
         buffer = self.createBuffer(usage=usage, size=bsize, mappedAtCreation=True)
         range = buffer.getMappedRange(0, bsize)
-        range.copy_bytes(data, bsize)
+        range.copy_bytes(src, bsize)
         buffer.unmap()
         return buffer
 
+    def writeBufferData(
+        self, dst: xg.Buffer, offset: int, data: Union[bytes, memoryview, xg.DataPtr, Any]
+    ) -> None:
+        """Upload `data` into `dst` (which must have CopyDst usage) at `offset`;
+        the copy happens before the next queue submission. Goes through the
+        queue's internal staging ring, so no buffer is allocated or mapped
+        per call."""
+        if not isinstance(data, xg.DataPtr):
+            data = xg.DataPtr.wrap(data)
+        self.queue.writeBuffer(dst, offset, data)
+
     def readBuffer(self, buffer: xg.Buffer, offset: int, size: int) -> bytes:
         """Read a buffer from GPU->CPU; the buffer must have MapRead usage"""
-        buffer.mapAsync(
-            xg.MapMode.Read,
-            offset=offset,
-            size=size,
-            callback=mapped_cb,
-        )
-        self.poll(wait=True, wrappedSubmissionIndex=None)
-        # TODO: NYI: wgpuBufferGetMapState not implemented (wgpu-native 0.19.1.1)
-        # assert buffer.getMapState() == xg.BufferMapState.Mapped, "Buffer is not mapped!"
-        mapping = buffer.getMappedRange(0, size)
-        res = mapping.to_bytes()
-        buffer.unmap()
-        return res
+        return self.readBufferWith(buffer, offset, size, bytes)
+
+    def readBufferWith(
+        self,
+        buffer: xg.Buffer,
+        offset: int,
+        size: int,
+        consumer: Callable[[memoryview], T],
+    ) -> T:
+        """Map a buffer (which must have MapRead usage) and pass a view of the
+        mapped memory directly to `consumer`, avoiding an intermediate copy.
+        The view is only valid until `consumer` returns.
+        """
+        return self.readBufferAsync(buffer, offset, size, consumer).sync_wait()
+
+    def readBufferInto(
+        self, buffer: xg.Buffer, offset: int, size: int, out: Any
+    ) -> Any:
+        """Read a buffer (which must have MapRead usage) directly into `out`,
+        a writable buffer-protocol object (e.g., bytearray or ndarray) of at
+        least `size` bytes; returns `out`"""
+        return self.readBufferWith(buffer, offset, size, _copy_into(out, size))
+
+    def readBufferView(self, buffer: xg.Buffer, offset: int, size: int) -> memoryview:
+        """Map a buffer (which must have MapRead usage) and return a view of
+        the mapped memory without copying; the buffer stays mapped until the
+        view (and anything derived from it) is garbage collected"""
+        BufferReadFuture(self, buffer, offset, size, bytes)._wait_mapped()
+        mapping = buffer.getMappedRange(offset, size)
+        ptr = xg.ffi.gc(xg.ffi.cast("char *", mapping._ptr), lambda _: buffer.unmap())
+        return memoryview(xg.ffi.buffer(ptr, size))
+
+    def readBufferAsync(
+        self,
+        buffer: xg.Buffer,
+        offset: int,
+        size: int,
+        consumer: Callable[[memoryview], T] = bytes,  # type: ignore
+    ) -> "BufferReadFuture[T]":
+        """Start mapping a buffer (which must have MapRead usage) without
+        waiting on the GPU; the returned future's `sync_wait()` produces
+        `consumer(mapped memory)` (by default, a copy as bytes). Under
+        emscripten, where the synchronous reads can't wait, use `then()`.
+        """
+        return BufferReadFuture(self, buffer, offset, size, consumer)
 
     def readBufferStaged(self, buffer: xg.Buffer, offset: int, size: int) -> bytes:
         """Read a buffer from GPU->CPU, using a temporary staging buffer if
@@ -98,75 +352,237 @@ class XDevice(xg.Device):
         if xg.BufferUsage.MapRead in buffer.getUsage():
             # no need for staging buffer
             return self.readBuffer(buffer, offset, size)
-        staging = self.createBuffer(
-            usage=xg.BufferUsage.CopyDst | xg.BufferUsage.MapRead,
-            size=size,
-            mappedAtCreation=False,
-        )
+        staging = self._acquire_staging(size)
         encoder = self.createCommandEncoder()
         encoder.copyBufferToBuffer(buffer, offset, staging, 0, size)
-        self.getQueue().submit([encoder.finish()])
-        return self.readBuffer(staging, 0, size)
+        self.queue.submit([encoder.finish()])
+        return self._read_staging(staging, size, bytes)
 
     def readRawTexture(
         self, tex: xg.Texture, bytesize: int, layout: xg.TextureDataLayout
     ) -> bytes:
-        (w, h, d) = (tex.getWidth(), tex.getHeight(), tex.getDepthOrArrayLayers())
-        readbuff = self.createBuffer(
-            usage=xg.BufferUsage.CopyDst | xg.BufferUsage.MapRead,
-            size=bytesize,
-            mappedAtCreation=False,
-        )
+        readbuff = self._acquire_staging(bytesize)
         encoder = self.createCommandEncoder()
-        encoder.copyTextureToBuffer(
-            source=xg.imageCopyTexture(
-                texture=tex,
-                mipLevel=0,
-                origin=xg.origin3D(x=0, y=0, z=0),
-                aspect=xg.TextureAspect.All,
-            ),
-            destination=xg.imageCopyBuffer(
-                layout=layout,
-                buffer=readbuff,
-            ),
-            copySize=xg.extent3D(width=w, height=h, depthOrArrayLayers=d),
+        self._copy_texture_to_buffer(
+            encoder, tex, readbuff, layout, tex.getDepthOrArrayLayers()
         )
-        self.getQueue().submit([encoder.finish()])
-        return self.readBuffer(readbuff, 0, bytesize)
-
-    def readRGBATexture(self, tex: xg.Texture) -> bytes:
+        self.queue.submit([encoder.finish()])
+        return self._read_staging(readbuff, bytesize, bytes)
+
+    def readRGBATexture(self, tex: xg.Texture, out: Optional[Any] = None) -> Any:
+        """Read back an RGBA texture as packed bytes; or, if `out` (a writable
+        buffer-protocol object of at least w*h*4 bytes) is given, copy the
+        pixels straight into it and return `out`"""
+        if out is None:
+            return self.readRGBATextureWith(tex, bytes)
+        size = tex.getWidth() * tex.getHeight() * 4
+        return self.readRGBATextureWith(tex, _copy_into(out, size))
+
+    def readRGBATextureWith(
+        self, tex: xg.Texture, consumer: Callable[[memoryview], T]
+    ) -> T:
+        """Like readRGBATexture, but passes the mapped pixel data directly to
+        `consumer` (see readBufferWith)"""
         (w, h) = (tex.getWidth(), tex.getHeight())
-        bytesize = w * h * 4
-        # create a staging buffer?
-        readbuff = self.createBuffer(
-            usage=xg.BufferUsage.CopyDst | xg.BufferUsage.MapRead,
-            size=bytesize,
-            mappedAtCreation=False,
-        )
+        row_bytes = w * 4
+        bytes_per_row = round_up_to(row_bytes, COPY_BYTES_PER_ROW_ALIGNMENT)
+        bytesize = bytes_per_row * h
+        readbuff = self._acquire_staging(bytesize)
         encoder = self.createCommandEncoder()
-        encoder.copyTextureToBuffer(
-            source=xg.imageCopyTexture(
-                texture=tex,
-                mipLevel=0,
-                origin=xg.origin3D(x=0, y=0, z=0),
-                aspect=xg.TextureAspect.All,
-            ),
-            destination=xg.imageCopyBuffer(
-                layout=xg.textureDataLayout(offset=0, bytesPerRow=w * 4, rowsPerImage=h),
-                buffer=readbuff,
-            ),
-            copySize=xg.extent3D(width=w, height=h, depthOrArrayLayers=1),
-        )
-        self.getQueue().submit([encoder.finish()])
-        return self.readBuffer(readbuff, 0, bytesize)
+        self._copy_layout.bytesPerRow = bytes_per_row
+        self._copy_layout.rowsPerImage = h
+        self._copy_texture_to_buffer(encoder, tex, readbuff, self._copy_layout)
+        self.queue.submit([encoder.finish()])
+
+        def _packed(view: memoryview) -> T:
+            return consumer(memoryview(unpad_rows(view, row_bytes, bytes_per_row, h)))
+
+        # if rows were padded to the copy alignment, pack them before handing out
+        read_consumer = consumer if bytes_per_row == row_bytes else _packed
+
+        return self._read_staging(readbuff, bytesize, read_consumer)
+
+    def readManyTextures(self, textures: List[xg.Texture]) -> List[bytes]:
+        """Read back several RGBA textures (as in readRGBATexture) with a single
+        submission, mapping all staging buffers before waiting on any"""
+        staged = []
+        encoder = self.createCommandEncoder()
+        for tex in textures:
+            (w, h) = (tex.getWidth(), tex.getHeight())
+            bytes_per_row = round_up_to(w * 4, COPY_BYTES_PER_ROW_ALIGNMENT)
+            readbuff = self._acquire_staging(bytes_per_row * h)
+            self._copy_layout.bytesPerRow = bytes_per_row
+            self._copy_layout.rowsPerImage = h
+            self._copy_texture_to_buffer(encoder, tex, readbuff, self._copy_layout)
+            staged.append((readbuff, w * 4, bytes_per_row, h))
+        self.queue.submit([encoder.finish()])
+        futures: List[BufferReadFuture[bytes]] = []
+        try:
+            for readbuff, row_bytes, bytes_per_row, h in staged:
+                unpad = functools.partial(
+                    unpad_rows, row_bytes=row_bytes, stride=bytes_per_row, rows=h
+                )
+                futures.append(
+                    BufferReadFuture(self, readbuff, 0, bytes_per_row * h, unpad)
+                )
+            results = [future.sync_wait() for future in futures]
+        except BaseException:
+            # settle every outstanding mapping (which unmaps its buffer), then
+            # destroy the staging buffers rather than pooling possibly-mapped ones
+            for future in futures:
+                try:
+                    future.sync_wait()
+                except Exception:
+                    pass
+            for readbuff, _, _, _ in staged:
+                readbuff.destroy()
+            raise
+        for readbuff, _, _, _ in staged:
+            self._release_staging(readbuff)
+        return results
 
     def getLimits2(self) -> xg.Limits:
-        happy = self.getLimits(self.limits)
-        if not happy:
-            raise RuntimeError("Failed to get limits.")
+        """See XAdapter.getLimits2"""
+        if _query_limits(self.getLimits, self.limits):
+            self.limits_version += 1
         return self.limits.limits
 
 
+class _MapSlot:
+    """A registered map callback that forwards to whichever BufferReadFuture
+    currently holds it, so callbacks needn't be created per readback"""
+
+    def __init__(self) -> None:
+        self.future: Optional[BufferReadFuture] = None
+        self.callback = xg.BufferMapAsyncCallback(self._on_mapped)
+
+    def _on_mapped(self, status: xg.BufferMapAsyncStatus) -> None:
+        if self.future is not None:
+            self.future._on_mapped(status)
+
+
+class BufferReadFuture(Generic[T]):
+    """A pending buffer readback, see XDevice.readBufferAsync"""
+
+    def __init__(
+        self,
+        device: XDevice,
+        buffer: xg.Buffer,
+        offset: int,
+        size: int,
+        consumer: Callable[[memoryview], T],
+    ):
+        self._device = device
+        self._buffer = buffer
+        self._offset = offset
+        self._size = size
+        self._consumer = consumer
+        self._status: Optional[xg.BufferMapAsyncStatus] = None
+        self._mapped = threading.Event()
+        self._consumed = False
+        self._result: Optional[T] = None
+        # mapping or consumer failure, raised again by every later sync_wait
+        self._error: Optional[BaseException] = None
+        self._then: List[Callable[[T], Any]] = []
+        self._slot: Optional[_MapSlot] = device._acquire_map_slot(self)
+        buffer.mapAsync(
+            xg.MapMode.Read, offset=offset, size=size, callback=self._slot.callback
+        )
+
+    def _on_mapped(self, status: xg.BufferMapAsyncStatus) -> None:
+        self._status = status
+        self._mapped.set()
+        if len(self._then) > 0:
+            result = self.sync_wait()
+            for callback in self._then:
+                callback(result)
+            self._then.clear()
+
+    def then(self, callback: Callable[[T], Any]) -> "BufferReadFuture[T]":
+        """Call `callback` with the consumed data once the mapping completes
+        (immediately, if it already has); like the map callback itself, this
+        happens from within a device poll"""
+        if self.done():
+            callback(self.sync_wait())
+        else:
+            self._then.append(callback)
+        return self
+
+    def done(self) -> bool:
+        """Whether the mapping has completed (without polling the device)"""
+        return self._status is not None
+
+    def sync_wait(self) -> T:
+        """Wait for the mapping to complete, and return the consumed data.
+        Under emscripten the device can't be polled, so this raises a
+        RuntimeError if the mapping hasn't completed yet (use then())."""
+        if self._error is not None:
+            raise self._error
+        if self._consumed:
+            return self._result  # type: ignore
+        self._wait_mapped()
+        mapping = self._buffer.getMappedRange(self._offset, self._size)
+        view = memoryview(mapping.buffer_view())
+        try:
+            self._result = self._consumer(view)
+        except BaseException as e:
+            # the buffer is unmapped below, so the read can't be retried
+            self._error = e
+            raise
+        finally:
+            view.release()
+            self._buffer.unmap()
+        self._consumed = True
+        return self._result
+
+    def _wait_mapped(self) -> None:
+        if self._error is not None:
+            raise self._error
+        # Poll without blocking (poll(wait=True) holds the device and stalls
+        # submissions from other threads); the callback may also be fired by
+        # another thread's poll
+        if not _CAN_POLL and not self._mapped.is_set():
+            # the map callback can only fire once control returns to the
+            # browser event loop, so waiting here would never finish
+            raise RuntimeError(
+                "Cannot wait for a readback without polling; use then() instead"
+            )
+        while not self._mapped.is_set():
+            self._device.poll(wait=False, wrappedSubmissionIndex=None)
+            self._mapped.wait(0.001)
+        if self._slot is not None:
+            self._device._release_map_slot(self._slot)
+            self._slot = None
+        if self._status != xg.BufferMapAsyncStatus.Success:
+            self._error = RuntimeError(f"Mapping error! {self._status}")
+            raise self._error
+        # TODO: NYI: wgpuBufferGetMapState not implemented (wgpu-native 0.19.1.1)
+        # assert buffer.getMapState() == xg.BufferMapState.Mapped, "Buffer is not mapped!"
+
+
+class XTexture(xg.Texture):
+    def __init__(self, inner: xg.Texture):
+        """Wrap a Texture into an XTexture; invalidates the Texture object"""
+        self._cdata = inner._cdata
+        inner.invalidate()
+        self._mip_levels: Optional[int] = None
+        self._array_layers: Optional[int] = None
+
+    @property
+    def mip_levels(self) -> int:
+        """Mip level count (queried once: it can't change after creation)"""
+        if self._mip_levels is None:
+            self._mip_levels = self.getMipLevelCount()
+        return self._mip_levels
+
+    @property
+    def array_layers(self) -> int:
+        """Depth or array layer count (queried once)"""
+        if self._array_layers is None:
+            self._array_layers = self.getDepthOrArrayLayers()
+        return self._array_layers
+
+
 class XSurface(xg.Surface):
     def __init__(self, inner: xg.Surface):
         """Wrap a Surface into an XSurface; invalidates the Surface object"""
@@ -174,18 +590,79 @@ class XSurface(xg.Surface):
         inner.invalidate()
         self.surf_tex = xg.SurfaceTexture()
 
-    def getCurrentTexture2(self) -> xg.SurfaceTexture:
-        self.getCurrentTexture(self.surf_tex)
-        return self.surf_tex
+    def getCurrentTexture2(
+        self, out: Optional[xg.SurfaceTexture] = None
+    ) -> xg.SurfaceTexture:
+        """Get the current surface texture, filling `out` if provided
+        (otherwise a SurfaceTexture owned by this surface is reused)"""
+        if out is None:
+            out = self.surf_tex
+        self.getCurrentTexture(out)
+        return out
+
+
+class ReleasePool:
+    """Collects objects that need `.release()` over the course of a frame,
+    and releases them all at once with `flush()`"""
+
+    def __init__(self, capacity: int = 8):
+        self._items: List[Any] = [None] * capacity
+        self._count = 0
+
+    def add(self, item: T) -> T:
+        if self._count < len(self._items):
+            self._items[self._count] = item
+        else:
+            self._items.append(item)
+        self._count += 1
+        return item
+
+    def flush(self) -> None:
+        items = self._items
+        for idx in range(self._count):
+            items[idx].release()
+            items[idx] = None
+        self._count = 0
+
+
+# (binding, visibility, kind, fields): `kind` names the sub-layout of the
+# BindGroupLayoutEntry to fill ("buffer", "texture", "storageTexture" or
+# "sampler") and `fields` the values of its members
+LayoutSpec = Tuple[int, Union[xg.ShaderStageFlags, int], str, Dict[str, Any]]
+
+
+def buildLayoutEntries(specs: List[LayoutSpec]) -> xg.BindGroupLayoutEntryList:
+    """Build one contiguous array of layout entries, filling the C structs
+    directly rather than through per-entry *BindingLayout wrappers"""
+    entries = xg.BindGroupLayoutEntryList(items=[], count=len(specs))
+    for idx, (binding, visibility, kind, fields) in enumerate(specs):
+        entry = entries._ptr[idx]
+        entry.binding = binding
+        entry.visibility = int(visibility)
+        sub = getattr(entry, kind)
+        for name, value in fields.items():
+            setattr(sub, name, int(value))
+    return entries
+
+
+def makeBindGroupLayout(
+    device: xg.Device, specs: List[LayoutSpec], label: Optional[str] = None
+) -> xg.BindGroupLayout:
+    return device.createBindGroupLayout(label=label, entries=buildLayoutEntries(specs))
 
 
-class BindRef:
+class BindRef(ABC):
     def __init__(self, binding: int, visibility: Union[xg.ShaderStageFlags, int]):
         self._ptr = xg.ffi.NULL
         self._binding = binding
-        self._layout = xg.BindGroupLayoutEntry(cdata=None, parent=None)
-        self._layout.binding = binding
-        self._layout.visibility = visibility
+        self._visibility = visibility
+        # the currently bound resource, used as the bindgroup cache key
+        self._obj: Any = None
+
+    @property
+    @abstractmethod
+    def spec(self) -> LayoutSpec:
+        """Layout entry description, see buildLayoutEntries"""
 
 
 class BufferBinding(BindRef):
@@ -198,13 +675,18 @@ class BufferBinding(BindRef):
         minsize: int = 0,
     ):
         super().__init__(binding, visibility)
-        self._layout.buffer = xg.bufferBindingLayout(
-            type=type,
-            hasDynamicOffset=dynoffset,
-            minBindingSize=minsize,
-        )
+        self._fields: Dict[str, Any] = {
+            "type": type,
+            "hasDynamicOffset": dynoffset,
+            "minBindingSize": minsize,
+        }
+
+    @property
+    def spec(self) -> LayoutSpec:
+        return (self._binding, self._visibility, "buffer", self._fields)
 
     def set(self, buffer: xg.Buffer, offset: int = 0, size: Optional[int] = None) -> None:
+        self._obj = buffer
         self._ptr.buffer = buffer._cdata
         self._ptr.offset = offset
         if size is not None:
@@ -212,6 +694,10 @@ class BufferBinding(BindRef):
         else:
             self._ptr.size = buffer.getSize()
 
+    def set_offset(self, offset: int) -> None:
+        """Rebind the already set buffer at a new offset (keeping the size)"""
+        self._ptr.offset = offset
+
 
 class TextureBinding(BindRef):
     def __init__(
@@ -223,13 +709,18 @@ class TextureBinding(BindRef):
         multisampled: bool = False,
     ):
         super().__init__(binding, visibility)
-        self._layout.texture = xg.textureBindingLayout(
-            sampleType=sampletype,
-            viewDimension=viewdim,
-            multisampled=multisampled,
-        )
+        self._fields: Dict[str, Any] = {
+            "sampleType": sampletype,
+            "viewDimension": viewdim,
+            "multisampled": multisampled,
+        }
+
+    @property
+    def spec(self) -> LayoutSpec:
+        return (self._binding, self._visibility, "texture", self._fields)
 
     def set(self, textureView: xg.TextureView) -> None:
+        self._obj = textureView
         self._ptr.textureView = textureView._cdata
 
 
@@ -243,13 +734,18 @@ class StorageTextureBinding(BindRef):
         access: xg.StorageTextureAccess = xg.StorageTextureAccess.WriteOnly,
     ):
         super().__init__(binding, visibility)
-        self._layout.storageTexture = xg.storageTextureBindingLayout(
-            format=format,
-            viewDimension=viewdim,
-            access=access,
-        )
+        self._fields: Dict[str, Any] = {
+            "format": format,
+            "viewDimension": viewdim,
+            "access": access,
+        }
+
+    @property
+    def spec(self) -> LayoutSpec:
+        return (self._binding, self._visibility, "storageTexture", self._fields)
 
     def set(self, textureView: xg.TextureView) -> None:
+        self._obj = textureView
         self._ptr.textureView = textureView._cdata
 
 
@@ -261,32 +757,61 @@ class SamplerBinding(BindRef):
         type: xg.SamplerBindingType = xg.SamplerBindingType.Filtering,
     ):
         super().__init__(binding, visibility)
-        self._layout.sampler = xg.samplerBindingLayout(
-            type=type,
-        )
+        self._fields: Dict[str, Any] = {"type": type}
+
+    @property
+    def spec(self) -> LayoutSpec:
+        return (self._binding, self._visibility, "sampler", self._fields)
 
     def set(self, sampler: xg.Sampler) -> None:
+        self._obj = sampler
         self._ptr.sampler = sampler._cdata
 
 
 class Binder:
     def __init__(self, device: xg.Device, entries: List[BindRef]):
         self._device = device
-        self.layout = device.createBindGroupLayout(
-            entries=[entry._layout for entry in entries]
-        )
+        self.layout = makeBindGroupLayout(device, [entry.spec for entry in entries])
         self._entries = entries
         self._bind_entries = xg.BindGroupEntryList(items=[], count=len(entries))
         for idx, entry in enumerate(entries):
             ptr = self._bind_entries._ptr[idx]
             ptr.binding = entry._binding
             entry._ptr = ptr
+        self._bg_cache: Dict[tuple, Tuple[xg.BindGroup, tuple]] = {}
 
     def create_bindgroup(self) -> xg.BindGroup:
         return self._device.createBindGroup(
             layout=self.layout, entries=self._bind_entries
         )
 
+    def create_bindgroup_cached(self) -> xg.BindGroup:
+        """Like create_bindgroup, but binding the same resources again returns
+        the same (cached) bindgroup. The cache owns these bindgroups, so they
+        must not be released by the caller; at most BINDGROUP_CACHE_LIMIT are
+        kept, oldest evicted first."""
+        objs = tuple(e._obj for e in self._entries)
+        key = tuple(
+            (id(obj), e._ptr.offset, e._ptr.size) for obj, e in zip(objs, self._entries)
+        )
+        hit = self._bg_cache.get(key)
+        # the cache holds references to the bound resources, so their ids can't
+        # be reused while an entry exists; they can still have been released
+        if hit is not None and all(
+            obj is not None and obj._cdata != xg.ffi.NULL for obj in objs
+        ):
+            return hit[0]
+        bg = self.create_bindgroup()
+        self._bg_cache.pop(key, None)
+        if len(self._bg_cache) >= BINDGROUP_CACHE_LIMIT:
+            del self._bg_cache[next(iter(self._bg_cache))]
+        self._bg_cache[key] = (bg, objs)
+        return bg
+
+    def clear_cache(self) -> None:
+        """Drop bindgroups cached by create_bindgroup_cached"""
+        self._bg_cache.clear()
+
 
 class BinderBuilder:
     def __init__(self, device: xg.Device):